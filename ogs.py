@@ -8,7 +8,7 @@ from overlay_graphs.util import load_mechanisms
 from typing import Iterable, List
 
 
-def sanitize_mechanisms(mechanisms: List[Mechanism], verbosity: int = 0) -> Iterable[Mechanism]:
+def sanitize_mechanisms(mechanisms: List[Mechanism], verbosity: int = 0, processes: int = 1) -> Iterable[Mechanism]:
     sanitiser = MechanismSanitiser(
         [mod.smiles("O", name="Water", add=False),
          mod.smiles("[OH3+]", name="Hydronium", add=False),
@@ -20,20 +20,17 @@ def sanitize_mechanisms(mechanisms: List[Mechanism], verbosity: int = 0) -> Iter
         ignore_dative_bonds=True
     )
 
-    sanitised_mechanisms = list(sanitiser.sanitise_mechanisms(mechanisms, verbosity))
+    result = sanitiser.sanitise(mechanisms, verbosity, processes)
 
-    unsanitised_mechanisms = [mechanism for mechanism in mechanisms if all(mechanism.entry != sanitised_mechanism.entry or
-                                                                           mechanism.number != sanitised_mechanism.number
-                                                                           for sanitised_mechanism in sanitised_mechanisms)]
     if verbosity >= 1:
-        print(f"Number of incompatible proposals {len(unsanitised_mechanisms)} out of {len(mechanisms)}")
-        print(f"One step proposals {len([mechanism for mechanism in sanitised_mechanisms if len(mechanism.steps) == 1])}")
-        print(f"Processed a total of {sum(len(mechanism.steps) for mechanism in sanitised_mechanisms)} reaction steps")
+        print(f"Number of incompatible proposals {len(result.rejected)} out of {len(result)}")
+        print(f"One step proposals {result.one_step_count}")
+        print(f"Processed a total of {result.step_count} reaction steps in {result.elapsed:.2f}s")
 
         if verbosity >= 3:
-            print("\nIncompatible proposals: "+" ".join(map(str, unsanitised_mechanisms)))
+            print("\nIncompatible proposals: "+" ".join(map(str, result.rejected)))
 
-    return sanitised_mechanisms
+    return result.accepted
 
 
 def _compute_overlay_graphs():
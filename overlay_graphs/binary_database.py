@@ -0,0 +1,268 @@
+import json
+import mmap
+import networkx as nx
+import numpy as np
+import struct
+
+
+from overlay_graphs.overlay_graph import CompactOverlayGraph, OverlayGraph, compute_product_graphs
+from overlay_graphs.util import iterate_json_array
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+
+_magic = b"OGDB"
+_version = 2
+
+_header = struct.Struct("<4sIQQQQ")
+_graph_header = struct.Struct("<II16s")
+_digest_size = 16
+
+_entry_dtype = np.dtype([("entry", "<i8"), ("proposal", "<i8"), ("ec", "<i8"), ("first_graph", "<u8"),
+                         ("graph_count", "<u8"), ("mechanism_offset", "<u8"), ("mechanism_length", "<u8")])
+
+
+def _align(file: BinaryIO, alignment: int = 8):
+    remainder = file.tell() % alignment
+
+    if remainder != 0:
+        file.write(b"\0" * (alignment - remainder))
+
+
+def _marking_array(values: List[int]) -> np.ndarray:
+    if any(value < -128 or value > 127 for value in values):
+        raise ValueError("Overlay graph marking does not fit into int8")
+
+    return np.array(values, dtype="<i1")
+
+
+class _LabelTable:
+    def __init__(self):
+        self._labels: Dict[str, int] = {}
+
+    def __getitem__(self, label: str) -> int:
+        if label not in self._labels:
+            self._labels[label] = len(self._labels)
+
+        return self._labels[label]
+
+    def to_list(self) -> List[str]:
+        return list(self._labels)
+
+
+class OverlayGraphArrays:
+    def __init__(self, buffer: Any, offset: int, labels: List[str]):
+        node_count, edge_count, digest = _graph_header.unpack_from(buffer, offset)
+        offset += _graph_header.size
+
+        self._labels: List[str] = labels
+        self._digest: Optional[str] = digest.hex() if any(digest) else None
+
+        self.node_ids: np.ndarray = np.frombuffer(buffer, "<i8", node_count, offset)
+        offset += 8 * node_count
+
+        self.node_labels: np.ndarray = np.frombuffer(buffer, "<u4", node_count, offset)
+        offset += 4 * node_count
+        self.indptr: np.ndarray = np.frombuffer(buffer, "<u4", node_count + 1, offset)
+        offset += 4 * (node_count + 1)
+        self.indices: np.ndarray = np.frombuffer(buffer, "<u4", edge_count, offset)
+        offset += 4 * edge_count
+        self.edge_labels: np.ndarray = np.frombuffer(buffer, "<u4", edge_count, offset)
+        offset += 4 * edge_count
+
+        self.node_received: np.ndarray = np.frombuffer(buffer, "<i1", node_count, offset)
+        offset += node_count
+        self.node_donated: np.ndarray = np.frombuffer(buffer, "<i1", node_count, offset)
+        offset += node_count
+        self.edge_received: np.ndarray = np.frombuffer(buffer, "<i1", edge_count, offset)
+        offset += edge_count
+        self.edge_donated: np.ndarray = np.frombuffer(buffer, "<i1", edge_count, offset)
+
+    @property
+    def labels(self) -> List[str]:
+        return self._labels
+
+    @property
+    def digest(self) -> Optional[str]:
+        return self._digest
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    @property
+    def edge_sources(self) -> np.ndarray:
+        return np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(self.indptr.astype(np.int64)))
+
+    def to_compact_overlay_graph(self) -> CompactOverlayGraph:
+        return CompactOverlayGraph.from_arrays(self)
+
+    def to_overlay_graph(self) -> OverlayGraph:
+        return self.to_compact_overlay_graph().to_overlay_graph()
+
+
+def _write_overlay_graph(file: BinaryIO, og_json: Dict[str, Any], labels: _LabelTable) -> int:
+    _align(file)
+    offset = file.tell()
+
+    nodes = og_json["nodes"]
+    positions = {node["id"]: index for index, node in enumerate(nodes)}
+
+    adjacency: List[List[Tuple[int, Dict[str, Any]]]] = [[] for _ in nodes]
+    for edge in og_json["edges"]:
+        source, target = sorted((positions[edge["src"]], positions[edge["tar"]]))
+        adjacency[source].append((target, edge))
+
+    edges = [(target, edge) for neighbours in adjacency for target, edge in sorted(neighbours, key=lambda n: n[0])]
+
+    indptr = np.zeros(len(nodes) + 1, dtype="<u4")
+    indptr[1:] = np.cumsum([len(neighbours) for neighbours in adjacency])
+
+    digest = bytes.fromhex(og_json["digest"]) if og_json.get("digest") is not None else bytes(_digest_size)
+    if len(digest) != _digest_size:
+        raise ValueError(f"Overlay graph digest must be {_digest_size} bytes long")
+
+    file.write(_graph_header.pack(len(nodes), len(edges), digest))
+    file.write(np.array([node["id"] for node in nodes], dtype="<i8").tobytes())
+    file.write(np.array([labels[node["label"]] for node in nodes], dtype="<u4").tobytes())
+    file.write(indptr.tobytes())
+    file.write(np.array([target for target, edge in edges], dtype="<u4").tobytes())
+    file.write(np.array([labels[edge["label"]] for target, edge in edges], dtype="<u4").tobytes())
+    file.write(_marking_array([node["electrons_received"] for node in nodes]).tobytes())
+    file.write(_marking_array([node["electrons_donated"] for node in nodes]).tobytes())
+    file.write(_marking_array([edge["electrons_received"] for target, edge in edges]).tobytes())
+    file.write(_marking_array([edge["electrons_donated"] for target, edge in edges]).tobytes())
+
+    return offset
+
+
+def write_binary_database(path: str, entries: Iterable[Dict[str, Any]]):
+    labels = _LabelTable()
+
+    graph_offsets: List[int] = []
+    entry_rows: List[Tuple[int, int, int, int, int, int, int]] = []
+
+    with open(path, "wb") as file:
+        file.write(_header.pack(_magic, _version, 0, 0, 0, 0))
+
+        for entry_json in entries:
+            mechanism_json = entry_json["mechanism"]
+            first_graph = len(graph_offsets)
+
+            for og_json in entry_json["overlay_graphs"]:
+                graph_offsets.append(_write_overlay_graph(file, og_json, labels))
+
+            mechanism_data = json.dumps(mechanism_json).encode("utf-8")
+            mechanism_offset = file.tell()
+            file.write(mechanism_data)
+
+            ec = labels[mechanism_json["ec"]] if "ec" in mechanism_json else -1
+
+            entry_rows.append((mechanism_json["entry"], mechanism_json["proposal"], ec, first_graph,
+                               len(graph_offsets) - first_graph, mechanism_offset, len(mechanism_data)))
+
+        labels_offset = file.tell()
+        file.write(json.dumps(labels.to_list()).encode("utf-8"))
+
+        _align(file)
+        index_offset = file.tell()
+        file.write(np.array(graph_offsets, dtype="<u8").tobytes())
+        file.write(np.array(entry_rows, dtype=_entry_dtype).tobytes())
+
+        file.seek(0)
+        file.write(_header.pack(_magic, _version, len(entry_rows), len(graph_offsets), labels_offset, index_offset))
+
+
+def convert_json_database(json_path: str, binary_path: str):
+    with open(json_path, "rb") as file:
+        write_binary_database(binary_path, (entry_json for start, end, entry_json in iterate_json_array(file)))
+
+
+def is_binary_database(path: str) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(_magic)) == _magic
+
+
+class BinaryOverlayGraphDatabase:
+    def __init__(self, path: str):
+        self._file: BinaryIO = open(path, "rb")
+        self._buffer: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, entry_count, graph_count, labels_offset, index_offset = _header.unpack_from(self._buffer, 0)
+        if magic != _magic or version != _version:
+            self.close()
+            raise ValueError(f"'{path}' is not an overlay graph database of version {_version}")
+
+        self._labels: List[str] = json.loads(self._buffer[labels_offset:index_offset].rstrip(b"\0"))
+
+        self._graph_offsets: np.ndarray = np.frombuffer(self._buffer, "<u8", graph_count, index_offset)
+        self._entries: np.ndarray = np.frombuffer(self._buffer, _entry_dtype, entry_count,
+                                                  index_offset + 8 * graph_count)
+
+    def __enter__(self) -> 'BinaryOverlayGraphDatabase':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def graph_count(self) -> int:
+        return len(self._graph_offsets)
+
+    def entry_key(self, index: int) -> Tuple[int, int]:
+        row = self._entries[index]
+
+        return int(row["entry"]), int(row["proposal"])
+
+    def entry_ec(self, index: int) -> Optional[str]:
+        ec = int(self._entries[index]["ec"])
+
+        return self._labels[ec] if ec >= 0 else None
+
+    def entry_graphs(self, index: int) -> range:
+        row = self._entries[index]
+
+        return range(int(row["first_graph"]), int(row["first_graph"]) + int(row["graph_count"]))
+
+    def mechanism_data(self, index: int) -> bytes:
+        row = self._entries[index]
+        start = int(row["mechanism_offset"])
+
+        return self._buffer[start:start + int(row["mechanism_length"])]
+
+    def mechanism_json(self, index: int) -> Dict[str, Any]:
+        return json.loads(self.mechanism_data(index))
+
+    def graph_arrays(self, index: int) -> OverlayGraphArrays:
+        return OverlayGraphArrays(self._buffer, int(self._graph_offsets[index]), self._labels)
+
+    def compact_overlay_graph(self, index: int) -> CompactOverlayGraph:
+        return self.graph_arrays(index).to_compact_overlay_graph()
+
+    def overlay_graph(self, index: int) -> OverlayGraph:
+        return self.graph_arrays(index).to_overlay_graph()
+
+    def product_graphs(self, indices: Optional[Iterable[int]] = None) -> Tuple[List[Optional[nx.Graph]], np.ndarray]:
+        if indices is None:
+            indices = range(self.graph_count)
+
+        return compute_product_graphs([self.compact_overlay_graph(index) for index in indices])
+
+    def close(self):
+        self._graph_offsets = None
+        self._entries = None
+
+        if not self._buffer.closed:
+            try:
+                self._buffer.close()
+            except BufferError:
+                # Arrays handed out by graph_arrays still view the mapping; it is released with them.
+                pass
+
+        self._file.close()
@@ -1,17 +1,64 @@
+import hashlib
+import json
 import mod
 import networkx as nx
 
 
-from overlay_graphs.networkx_converter import get_component_graphs, graph_to_nx_graph, graph_to_unlabeled_edge_nx_graph,\
-    nx_graph_to_gml, rule_combined_graph_to_nx_graph
-from typing import Dict, Iterable, Tuple, Union
+from collections import OrderedDict
+from overlay_graphs.networkx_converter import graph_to_unlabeled_edge_nx_graph, nx_graph_to_gml, nx_graph_to_mod_graph,\
+    nx_graph_to_unlabeled_edge_nx_graph, rule_combined_nx_graph, rule_left_nx_graph, rule_right_nx_graph
+from overlay_graphs.util import parallel_map
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+_digest_size = 16
+_cache_key_size = 16
+
+
+def _gml_canonical_smiles(gml: str) -> str:
+    return mod.graphGMLString(gml).smiles
+
+
+def _ordered_graph(graph: nx.Graph) -> nx.Graph:
+    ordered = nx.Graph()
+
+    ordered.add_nodes_from(sorted(graph.nodes(data=True), key=lambda node: node[0]))
+    ordered.add_edges_from(sorted(((min(source, target), max(source, target), data)
+                                   for source, target, data in graph.edges(data=True)), key=lambda edge: edge[:2]))
+
+    return ordered
+
+
+def canonical_graph_digest(graph: nx.Graph) -> str:
+    labels = sorted({label for node, label in graph.nodes(data="label")} |
+                    {label for source, target, label in graph.edges(data="label")})
+    placeholders = {label: f"{index + 1}C" for index, label in enumerate(labels)}
+
+    smiles = sorted(_gml_canonical_smiles(nx_graph_to_gml(nx_graph_to_unlabeled_edge_nx_graph(
+        graph.subgraph(nodes), placeholders.__getitem__))) for nodes in nx.connected_components(graph))
+
+    return hashlib.blake2b(json.dumps([labels, smiles]).encode(), digest_size=_digest_size).hexdigest()
+
+
+def _cache_key(key: str) -> bytes:
+    return hashlib.blake2b(key.encode(), digest_size=_cache_key_size).digest()
 
 
 class CanonicalGraph:
-    def __init__(self, graph: mod.Graph, canonicaliser: 'GraphCanonicaliser'):
-        self._graph: mod.Graph = graph
+    def __init__(self, graph: Union[mod.Graph, nx.Graph], canonicaliser: 'GraphCanonicaliser',
+                 canonical_smiles: Optional[str] = None):
+        self._graph: Optional[mod.Graph] = None
+        self._nx_graph: Optional[nx.Graph] = None
+
+        if isinstance(graph, nx.Graph):
+            self._nx_graph = graph
+        else:
+            self._graph = graph
+
+        if canonical_smiles is None:
+            canonical_smiles = canonicaliser.graph_canonical_smiles(self.graph)
 
-        self._canonical_smiles: str = canonicaliser.graph_canonical_smiles(self._graph)
+        self._canonical_smiles: str = canonical_smiles
 
     def __eq__(self, other: 'CanonicalGraph') -> bool:
         return self.canonical_smiles == other.canonical_smiles
@@ -27,6 +74,10 @@ class CanonicalGraph:
 
     @property
     def graph(self) -> mod.Graph:
+        if self._graph is None:
+            self._graph = nx_graph_to_mod_graph(self._nx_graph)
+            self._nx_graph = None
+
         return self._graph
 
     @property
@@ -37,13 +88,12 @@ class CanonicalGraph:
 class CanonicalRule:
     def __init__(self, rule: mod.Rule, canonicaliser: 'GraphCanonicaliser'):
         self._rule: mod.Rule = rule
+        self._canonicaliser: GraphCanonicaliser = canonicaliser
 
-        self._canonical_smiles: Tuple[str] = canonicaliser.rule_canonical_smiles(self._rule)
+        self._canonical_smiles: Optional[Tuple[str]] = None
 
-        self._left: Tuple[CanonicalGraph] = canonicaliser.canonicalise_nx_graph(
-            graph_to_nx_graph(rule.left, use_indices=True))
-        self._right: Tuple[CanonicalGraph] = canonicaliser.canonicalise_nx_graph(
-            graph_to_nx_graph(rule.right, use_indices=True))
+        self._left: Optional[Tuple[CanonicalGraph]] = None
+        self._right: Optional[Tuple[CanonicalGraph]] = None
 
     def __eq__(self, other: 'CanonicalRule') -> bool:
         return self.canonical_smiles == other.canonical_smiles
@@ -57,26 +107,43 @@ class CanonicalRule:
     def __str__(self) -> str:
         return str(self.rule)
 
+    def _adopt_canonical_forms(self, other: 'CanonicalRule'):
+        self._canonical_smiles = other._canonical_smiles
+
+        self._left = CanonicalRule.left.fget(other)
+        self._right = CanonicalRule.right.fget(other)
+
     @property
     def rule(self) -> mod.Rule:
         return self._rule
 
     @property
     def canonical_smiles(self) -> Tuple[str]:
+        if self._canonical_smiles is None:
+            self._canonical_smiles = self._canonicaliser.rule_canonical_smiles(self._rule)
+
         return self._canonical_smiles
 
     @property
     def left(self) -> Tuple[CanonicalGraph]:
+        if self._left is None:
+            self._left = self._canonicaliser.canonicalise_nx_graph(rule_left_nx_graph(self._rule))
+
         return self._left
 
     @property
     def right(self) -> Tuple[CanonicalGraph]:
+        if self._right is None:
+            self._right = self._canonicaliser.canonicalise_nx_graph(rule_right_nx_graph(self._rule))
+
         return self._right
 
 
 class GraphCanonicaliser:
-    def __init__(self):
+    def __init__(self, cache_size: int = 16384):
         self._label_db: Dict[str, str] = {}
+        self._component_smiles: OrderedDict[bytes, str] = OrderedDict()
+        self._cache_size: int = max(cache_size, 1)
 
     def _relabel_via_database(self, label: str) -> str:
         if label not in self._label_db:
@@ -84,17 +151,48 @@ class GraphCanonicaliser:
 
         return self._label_db[label]
 
+    def _component_key(self, component: nx.Graph) -> str:
+        return nx_graph_to_gml(nx_graph_to_unlabeled_edge_nx_graph(_ordered_graph(component),
+                                                                   self._relabel_via_database))
+
+    def _cached_smiles(self, key: bytes) -> Optional[str]:
+        smiles = self._component_smiles.get(key)
+
+        if smiles is not None:
+            self._component_smiles.move_to_end(key)
+
+        return smiles
+
+    def _cache_smiles(self, key: bytes, smiles: str):
+        self._component_smiles[key] = smiles
+        self._component_smiles.move_to_end(key)
+
+        if len(self._component_smiles) > self._cache_size:
+            self._component_smiles.popitem(last=False)
+
+    def component_digest(self, component: nx.Graph) -> bytes:
+        return _cache_key(self._component_key(component))
+
+    def component_canonical_smiles(self, component: nx.Graph) -> str:
+        key = self._component_key(component)
+        cache_key = _cache_key(key)
+
+        smiles = self._cached_smiles(cache_key)
+        if smiles is None:
+            smiles = _gml_canonical_smiles(key)
+            self._cache_smiles(cache_key, smiles)
+
+        return smiles
+
     def graph_canonical_smiles(self, graph: mod.Graph) -> str:
-        return mod.graphGMLString(nx_graph_to_gml(
-            graph_to_unlabeled_edge_nx_graph(graph, lambda x: self._relabel_via_database(x)))).smiles
+        return _gml_canonical_smiles(nx_graph_to_gml(
+            graph_to_unlabeled_edge_nx_graph(graph, lambda x: self._relabel_via_database(x))))
 
     def nx_graph_canonical_smiles(self, graph: nx.Graph) -> Tuple[str]:
-        components = list(get_component_graphs(graph).keys())
-
-        return tuple(sorted(self.graph_canonical_smiles(component) for component in components))
+        return tuple(component.canonical_smiles for component in self.canonicalise_nx_graph(graph))
 
     def rule_canonical_smiles(self, rule: mod.Rule) -> Tuple[str]:
-        return self.nx_graph_canonical_smiles(rule_combined_graph_to_nx_graph(rule))
+        return self.nx_graph_canonical_smiles(rule_combined_nx_graph(rule))
 
     def canonical_smiles(self, graph: Union[mod.Graph, mod.Rule, nx.Graph]) -> Tuple[str]:
         if isinstance(graph, mod.Graph):
@@ -112,8 +210,43 @@ class GraphCanonicaliser:
         return {graph: self.canonicalise_graph(graph) for graph in graphs}
 
     def canonicalise_nx_graph(self, graph: nx.Graph) -> Tuple[CanonicalGraph]:
-        return tuple(sorted((CanonicalGraph(component, self) for component in get_component_graphs(graph)),
-                            key=lambda x: x.canonical_smiles))
+        return self.canonicalise_many([graph])[0]
+
+    def canonicalise_many(self, graphs: Iterable[nx.Graph], processes: int = 1) -> List[Tuple[CanonicalGraph]]:
+        graph_components: List[List[str]] = []
+        unique_components: Dict[str, nx.Graph] = {}
+
+        for graph in graphs:
+            components = []
+
+            for nodes in nx.connected_components(graph):
+                component = graph.subgraph(nodes)
+                key = self._component_key(component)
+
+                if key not in unique_components:
+                    unique_components[key] = component.copy()
+
+                components.append(key)
+
+            graph_components.append(components)
+
+        component_smiles = {key: self._cached_smiles(_cache_key(key)) for key in unique_components}
+        keys = [key for key, smiles in component_smiles.items() if smiles is None]
+
+        if processes > 1:
+            smiles = list(parallel_map(_gml_canonical_smiles, keys, processes))
+        else:
+            smiles = [_gml_canonical_smiles(key) for key in keys]
+
+        for key, key_smiles in zip(keys, smiles):
+            component_smiles[key] = key_smiles
+            self._cache_smiles(_cache_key(key), key_smiles)
+
+        canonical_components = {key: CanonicalGraph(unique_components[key], self, component_smiles[key])
+                                for key in unique_components}
+
+        return [tuple(sorted((canonical_components[key] for key in components), key=lambda x: x.canonical_smiles))
+                for components in graph_components]
 
     def canonicalise_rule(self, rule: mod.Rule) -> CanonicalRule:
         return CanonicalRule(rule, self)
@@ -0,0 +1,101 @@
+import networkx as nx
+
+
+from collections import Counter
+from overlay_graphs.canonicalisation import GraphCanonicaliser
+from typing import Dict, List, Optional, Set, Tuple
+
+
+ComponentInvariant = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def _component_invariant(component: nx.Graph) -> ComponentInvariant:
+    return tuple(sorted(label for node, label in component.nodes(data="label"))),\
+        tuple(sorted(label for source, target, label in component.edges(data="label")))
+
+
+class EnzymeComponentMatcher:
+    def __init__(self, canonicaliser: Optional[GraphCanonicaliser] = None, cache_size: int = 16384):
+        if canonicaliser is None:
+            canonicaliser = GraphCanonicaliser(cache_size)
+
+        self._canonicaliser: GraphCanonicaliser = canonicaliser
+
+    @property
+    def canonicaliser(self) -> GraphCanonicaliser:
+        return self._canonicaliser
+
+    def _isomorphic(self, left: nx.Graph, right: nx.Graph, invariants: Dict[int, ComponentInvariant],
+                    digests: Dict[int, bytes], smiles: Dict[int, str]) -> bool:
+        for component in (left, right):
+            if id(component) not in invariants:
+                invariants[id(component)] = _component_invariant(component)
+
+        if invariants[id(left)] != invariants[id(right)]:
+            return False
+
+        for component in (left, right):
+            if id(component) not in digests:
+                digests[id(component)] = self._canonicaliser.component_digest(component)
+
+        if digests[id(left)] == digests[id(right)]:
+            return True
+
+        for component in (left, right):
+            if id(component) not in smiles:
+                smiles[id(component)] = self._canonicaliser.component_canonical_smiles(component)
+
+        return smiles[id(left)] == smiles[id(right)]
+
+    def match(self, left: nx.Graph, right: nx.Graph) -> List[Tuple[nx.Graph, nx.Graph]]:
+        left_components = [left.subgraph(nodes).copy() for nodes in nx.connected_components(left)]
+        right_components = [right.subgraph(nodes).copy() for nodes in nx.connected_components(right)]
+
+        right_indices = {node: index for index, component in enumerate(right_components) for node in component.nodes}
+
+        invariants: Dict[int, ComponentInvariant] = {}
+        digests: Dict[int, bytes] = {}
+        smiles: Dict[int, str] = {}
+        matched: Set[int] = set()
+        pairs: List[Tuple[nx.Graph, nx.Graph]] = []
+
+        for left_component in left_components:
+            overlaps = Counter(right_indices[node] for node in left_component.nodes if node in right_indices)
+
+            for index in sorted(overlaps, key=lambda i: (-overlaps[i], i)):
+                right_component = right_components[index]
+
+                if index in matched or\
+                        not self._isomorphic(left_component, right_component, invariants, digests, smiles):
+                    continue
+
+                if overlaps[index] > left_component.number_of_nodes() / 2 or \
+                        any(left_component.nodes[node]["label"] != "H" for node in left_component.nodes
+                            if node in right_component.nodes):
+                    matched.add(index)
+                    pairs.append((left_component, right_component))
+                    break
+
+        return pairs
+
+    def enzyme_vertices(self, left: nx.Graph, right: nx.Graph) -> Tuple[Set[int], Set[int]]:
+        left_vertices = set()
+        right_vertices = set()
+
+        for left_component, right_component in self.match(left, right):
+            left_vertices.update(left_component.nodes)
+            right_vertices.update(right_component.nodes)
+
+        return left_vertices, right_vertices
+
+
+_shared_matcher: Optional[EnzymeComponentMatcher] = None
+
+
+def shared_enzyme_component_matcher() -> EnzymeComponentMatcher:
+    global _shared_matcher
+
+    if _shared_matcher is None:
+        _shared_matcher = EnzymeComponentMatcher()
+
+    return _shared_matcher
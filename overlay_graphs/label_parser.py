@@ -1,35 +1,100 @@
 import re
 
 
+from typing import Dict, Optional, Tuple
+
+
 _amino_pattern: re.Pattern = re.compile(r"^[\s]*Amino\([\s]*([a-zA-Z0-9+\-]+)[\s]*,[\s]*([a-zA-Z]+)[\s]*,"
                                         r"[\s]*([0-9]+)[^)]+\)[\s]*$")
 _alias_pattern: re.Pattern = re.compile(r"^[\s]*Alias\([\s]*([a-zA-Z0-9+\-]+)[\s]*,[^)]+\)[\s]*$")
 
 
+class VertexTerm:
+    def __init__(self, symbol: str, residue: Optional[str] = None, chain_position: Optional[str] = None):
+        self._symbol: str = symbol
+        self._residue: Optional[str] = residue
+        self._chain_position: Optional[str] = chain_position
+
+    @property
+    def symbol(self) -> str:
+        return self._symbol
+
+    @property
+    def residue(self) -> Optional[str]:
+        return self._residue
+
+    @property
+    def chain_position(self) -> Optional[str]:
+        return self._chain_position
+
+    @property
+    def is_amino(self) -> bool:
+        return self._residue is not None
+
+    @property
+    def is_alias(self) -> bool:
+        return self._residue is None
+
+    def abstract(self, preserve_chain_position: bool = False) -> str:
+        if self.is_alias:
+            return f"Alias({self.symbol}, *)"
+
+        if preserve_chain_position:
+            return f"Amino({self.symbol}, {self.residue}, {self.chain_position}, *)"
+
+        return f"Amino({self.symbol}, {self.residue}, *, *)"
+
+
+_terms: Dict[str, Optional[VertexTerm]] = {}
+_abstract_labels: Dict[Tuple[str, bool], str] = {}
+
+
+def _parse_vertex_term(label: str) -> Optional[VertexTerm]:
+    match = _amino_pattern.match(label)
+    if match is not None:
+        return VertexTerm(match.group(1), match.group(2), match.group(3))
+
+    match = _alias_pattern.match(label)
+    if match is not None:
+        return VertexTerm(match.group(1))
+
+    return None
+
+
+def parse_vertex_term(label: str) -> Optional[VertexTerm]:
+    if label not in _terms:
+        _terms[label] = _parse_vertex_term(label)
+
+    return _terms[label]
+
+
 def is_amino_term(label: str) -> bool:
-    return _amino_pattern.match(label) is not None
+    term = parse_vertex_term(label)
+
+    return term is not None and term.is_amino
 
 
 def is_alias_term(label: str) -> bool:
-    return _alias_pattern.match(label) is not None
+    term = parse_vertex_term(label)
+
+    return term is not None and term.is_alias
 
 
 def is_term(label: str) -> bool:
-    return is_amino_term(label) or is_alias_term(label)
+    return parse_vertex_term(label) is not None
 
 
 def abstract_vertex_term_details(label: str, preserve_chain_position: bool = False) -> str:
-    amino_acid_substitute = r"Amino(\1, \2, \3, *)" if preserve_chain_position else r"Amino(\1, \2, *, *)"
+    key = (label, preserve_chain_position)
 
-    label = _amino_pattern.sub(amino_acid_substitute, label)
-    label = _alias_pattern.sub(r"Alias(\1, *)", label)
+    if key not in _abstract_labels:
+        term = parse_vertex_term(label)
+        _abstract_labels[key] = term.abstract(preserve_chain_position) if term is not None else label
 
-    return label
+    return _abstract_labels[key]
 
 
 def remove_vertex_term(label: str) -> str:
-    label = _amino_pattern.sub(r"\1", label)
-    label = _alias_pattern.sub(r"\1", label)
-
-    return label
+    term = parse_vertex_term(label)
 
+    return term.symbol if term is not None else label
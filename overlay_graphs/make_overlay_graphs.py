@@ -5,14 +5,13 @@ import networkx as nx
 
 
 from collections import Counter
-from overlay_graphs.canonicalisation import GraphCanonicaliser
 from overlay_graphs.draw import print_overlay_graph
 from overlay_graphs.mechanism import Mechanism, Step
-from overlay_graphs.networkx_converter import get_component_graphs, graph_to_nx_graph
+from overlay_graphs.networkx_converter import rule_left_nx_graph
 from overlay_graphs.overlay_graph import OverlayGraph
 from overlay_graphs.reaction_sequence_tracking import IsomorphismCache
 from overlay_graphs.rule_builder import EdgeTuple
-from typing import Dict, Iterable, List, Optional, Tuple, Set, Union
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Set, Union
 
 
 _edge_valence_symbols = ["?", "-", "=", "#"]
@@ -41,10 +40,32 @@ def _parse_atom_maps(mechanisms: List[Mechanism], atom_map_file: str = "manual_a
     return atom_maps
 
 
-def _extend_overlay_graph(canonicaliser: GraphCanonicaliser, isomorphism_cache: 'IsomorphismCache',
-                          marking: 'OverlayMarking', atom_map: Dict[int, int], last_rule: mod.Rule,
-                          mechanism: List[Step], atom_maps: List[Dict[int, int]], verbosity: int = 0) ->\
-        Iterable[OverlayGraph]:
+class UniqueOverlayGraphs:
+    def __init__(self):
+        self._overlay_graphs: List[OverlayGraph] = []
+        self._wl_hashes: Dict[str, List[OverlayGraph]] = {}
+
+    def __iter__(self) -> Iterable[OverlayGraph]:
+        return iter(self._overlay_graphs)
+
+    def __len__(self) -> int:
+        return len(self._overlay_graphs)
+
+    def add(self, overlay_graph: OverlayGraph) -> bool:
+        candidates = self._wl_hashes.setdefault(overlay_graph.wl_hash, [])
+
+        if any(candidate.digest == overlay_graph.digest for candidate in candidates):
+            return False
+
+        candidates.append(overlay_graph)
+        self._overlay_graphs.append(overlay_graph)
+
+        return True
+
+
+def _extend_overlay_graph(isomorphism_cache: 'IsomorphismCache', marking: 'OverlayMarking', atom_map: Dict[int, int],
+                          last_rule: mod.Rule, mechanism: List[Step], atom_maps: List[Dict[int, int]],
+                          verbosity: int = 0) -> Iterable[OverlayGraph]:
     if len(mechanism) == 0:
         yield OverlayGraph(marking.host_graph, marking.to_dictionary())
         return
@@ -52,7 +73,7 @@ def _extend_overlay_graph(canonicaliser: GraphCanonicaliser, isomorphism_cache:
     if verbosity > 1:
         print(f"\t#\tExtending overlay graph after rule {last_rule}. {len(mechanism)} steps to go.")
 
-    canonical_overlay_graphs = set()
+    unique_overlay_graphs = UniqueOverlayGraphs()
     action_atoms: Set[int] = {atom_map[vertex] for vertex in marking.action}
     reaction_center = tuple(sorted(action_atoms))
 
@@ -74,22 +95,18 @@ def _extend_overlay_graph(canonicaliser: GraphCanonicaliser, isomorphism_cache:
                                                                    new_atom_map.items()})
 
         intermediary_og = OverlayGraph(new_marking.host_graph, new_marking.to_dictionary())
-        canonical_og = canonicaliser.canonicalise_nx_graph(intermediary_og.to_labelled_graph("L_+_-", "L_+_-"))
-        if canonical_og in canonical_overlay_graphs:
+        if not unique_overlay_graphs.add(intermediary_og):
             if verbosity > 3:
                 print(f"\t\t#\tIntermediary overlay graph after {last_rule} isomorphic to previous OG. Discarding...")
             continue
 
-        canonical_overlay_graphs.add(canonical_og)
-
-        yield from _extend_overlay_graph(canonicaliser, isomorphism_cache, new_marking, new_atom_map, mechanism[0].rule,
-                                         mechanism[1:], atom_maps[1:], verbosity)
+        yield from _extend_overlay_graph(isomorphism_cache, new_marking, new_atom_map, mechanism[0].rule, mechanism[1:],
+                                         atom_maps[1:], verbosity)
 
 
-def compute_overlay_graphs(canonicaliser: GraphCanonicaliser, isomorphism_cache: 'IsomorphismCache',
-                            mechanism: Mechanism, atom_maps: List[Dict[int, int]], verbosity: int = 0) ->\
-        Iterable[OverlayGraph]:
-    host_graph = graph_to_nx_graph(mechanism[0].rule.left, use_indices=True)
+def compute_overlay_graphs(isomorphism_cache: 'IsomorphismCache', mechanism: Mechanism,
+                           atom_maps: List[Dict[int, int]], verbosity: int = 0) -> Iterable[OverlayGraph]:
+    host_graph = rule_left_nx_graph(mechanism[0].rule)
 
     atom_map = {node: node for node in host_graph.nodes}
 
@@ -98,8 +115,8 @@ def compute_overlay_graphs(canonicaliser: GraphCanonicaliser, isomorphism_cache:
     if verbosity > 0:
         print(f"\t#\tCreated initial marking on {len(atom_map)} vertices.")
 
-    yield from _extend_overlay_graph(canonicaliser, isomorphism_cache, marking, atom_map, mechanism[0].rule,
-                                     list(mechanism)[1:], atom_maps[1:], verbosity)
+    yield from _extend_overlay_graph(isomorphism_cache, marking, atom_map, mechanism[0].rule, list(mechanism)[1:],
+                                     atom_maps[1:], verbosity)
 
 
 def overlay_graphs_for_mechanisms(mechanisms: List[Mechanism], output_name: str = "overlay_graphs",
@@ -108,8 +125,6 @@ def overlay_graphs_for_mechanisms(mechanisms: List[Mechanism], output_name: str
     if known_atom_maps is None:
         known_atom_maps = {}
 
-    canonicaliser = GraphCanonicaliser()
-
     with open(f"{output_name}.json", "w") as file:
         file.write("[\n]\n")
 
@@ -122,22 +137,18 @@ def overlay_graphs_for_mechanisms(mechanisms: List[Mechanism], output_name: str
 
         isomorphism_cache = IsomorphismCache()
 
-        canonical_overlay_graphs = {}
+        unique_overlay_graphs = UniqueOverlayGraphs()
 
         if mechanism not in known_atom_maps:
             known_atom_maps[mechanism] = [{}] * len(mechanism)
 
-        for index, overlay_graph in enumerate(compute_overlay_graphs(canonicaliser, isomorphism_cache, mechanism,
+        for index, overlay_graph in enumerate(compute_overlay_graphs(isomorphism_cache, mechanism,
                                                                      list(known_atom_maps[mechanism]), verbosity)):
-            canonical_overlay_graph = canonicaliser.canonicalise_nx_graph(overlay_graph.to_labelled_graph("L_+_-", "L_+_-"))
-            if canonical_overlay_graph in canonical_overlay_graphs:
-                continue
-
-            canonical_overlay_graphs[canonical_overlay_graph] = overlay_graph
+            unique_overlay_graphs.add(overlay_graph)
 
-        mod.postChapter(f"{mechanism.entry}_{mechanism.number} [{len(canonical_overlay_graphs)}]")
+        mod.postChapter(f"{mechanism.entry}_{mechanism.number} [{len(unique_overlay_graphs)}]")
 
-        for index, overlay_graph in enumerate(canonical_overlay_graphs.values()):
+        for index, overlay_graph in enumerate(unique_overlay_graphs):
             if index > 10:
                 break
 
@@ -151,11 +162,11 @@ def overlay_graphs_for_mechanisms(mechanisms: List[Mechanism], output_name: str
             if pos > 4:
                 file.write(",\n")
             file.write(json.dumps({"mechanism": mechanism.serialise(),
-                                   "overlay_graphs": [graph.serialise() for graph in canonical_overlay_graphs.values()]}))
+                                   "overlay_graphs": [graph.serialise() for graph in unique_overlay_graphs]}))
             file.write("]\n")
 
         if verbosity >= 1:
-            print(f"#\tFound {len(canonical_overlay_graphs)} unique overlay graphs.\n")
+            print(f"#\tFound {len(unique_overlay_graphs)} unique overlay graphs.\n")
 
     with open(f"{output_name}.json", "r") as file:
         data = json.load(file)
@@ -173,37 +184,33 @@ class OverlayMarking:
         self._electrons_donated: Counter[Union[int, EdgeTuple]] = Counter({element: 0 for element in self._elements})
         self._electrons_received: Counter[Union[int, EdgeTuple]] = Counter({element: 0 for element in self._elements})
 
+        self._action: Set[int] = set()
+
     @property
     def host_graph(self) -> nx.Graph:
-        clean_host = nx.Graph()
+        kept: Set[int] = set()
+        for nodes in nx.connected_components(self._host_graph):
+            if not self._action.isdisjoint(nodes):
+                kept.update(nodes)
 
-        for graph, nx_graph in get_component_graphs(self._host_graph).items():
-            if all(node not in self.action for node in nx_graph.nodes) and\
-                all(self._electrons_donated[EdgeTuple((source, target))] == 0 and
-                    self._electrons_received[EdgeTuple((source, target))] == 0 for source, target in
-                    nx_graph.edges):
-                continue
-
-            for node, data in nx_graph.nodes(data=True):
-                clean_host.add_node(node, label=data["label"])
+        clean_host = nx.Graph()
 
-            for source, target, data in nx_graph.edges(data=True):
-                label = data["label"] if data["label"] != ":" else ">"
-                clean_host.add_edge(source, target, label=label)
+        clean_host.add_nodes_from((node, {"label": label}) for node, label in self._host_graph.nodes(data="label")
+                                  if node in kept)
+        clean_host.add_edges_from((source, target, {"label": label if label != ":" else ">"})
+                                  for source, target, label in self._host_graph.edges(data="label") if source in kept)
 
         return clean_host
 
     @property
-    def action(self) -> Iterable[int]:
-        for element in self._elements:
-            if self._electrons_donated[element] == 0 and self._electrons_received[element] == 0:
-                continue
+    def action(self) -> FrozenSet[int]:
+        return frozenset(self._action)
 
-            if isinstance(element, int):
-                yield element
-            else:
-                yield element[0]
-                yield element[1]
+    def _mark_active(self, element: Union[int, EdgeTuple]):
+        if isinstance(element, int):
+            self._action.add(element)
+        else:
+            self._action.update(element)
 
     def _ensure_element_exists(self, element: Union[int, EdgeTuple]):
         if element in self._elements:
@@ -222,6 +229,7 @@ class OverlayMarking:
         copy._elements = set(self._elements)
         copy._electrons_donated = dict(self._electrons_donated)
         copy._electrons_received = dict(self._electrons_received)
+        copy._action = set(self._action)
 
         return copy
 
@@ -232,6 +240,7 @@ class OverlayMarking:
         self._ensure_element_exists(element)
 
         self._electrons_donated[element] += 1
+        self._mark_active(element)
 
     def add_electron_received(self, element: Union[int, Tuple[int, int]]):
         if not isinstance(element, int):
@@ -240,6 +249,7 @@ class OverlayMarking:
         self._ensure_element_exists(element)
 
         self._electrons_received[element] += 1
+        self._mark_active(element)
 
     def update_from_rule(self, rule: mod.Rule, atom_map: Dict[int, int]) -> 'OverlayMarking':
         result = self.copy()
@@ -1,9 +1,17 @@
 import json
+import os
 
 
-from overlay_graphs.mechanism import ECNumber, Mechanism
+from collections import OrderedDict
+from itertools import islice
+from overlay_graphs.binary_database import BinaryOverlayGraphDatabase, is_binary_database
+from overlay_graphs.mechanism import ECNumber, Mechanism, ec_level_key
 from overlay_graphs.overlay_graph import OverlayGraph
-from typing import Any, Dict, Iterable, List, Optional
+from overlay_graphs.util import iterate_json_array
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+_index_version = 1
 
 
 class MCSAEntry:
@@ -46,13 +54,347 @@ class MCSAEntry:
         return MCSAEntry(Mechanism.deserialise(entry_json["mechanism"]),
                          (OverlayGraph.deserialise(og_json) for og_json in entry_json["overlay_graphs"]))
 
+    def serialise(self) -> Dict[str, Any]:
+        return {
+            "mechanism": self._mechanism.serialise(),
+            "overlay_graphs": [overlay_graph.serialise() for overlay_graph in self._overlay_graphs]
+        }
+
+
+class MCSAIndexEntry:
+    def __init__(self, entry: int, mechanism: int, ec: Optional[ECNumber], overlay_graph_count: int,
+                 location: Tuple[int, int]):
+        self._entry: int = entry
+        self._mechanism: int = mechanism
+        self._ec: Optional[ECNumber] = ec
+        self._overlay_graph_count: int = overlay_graph_count
+
+        self._location: Tuple[int, int] = location
+
+    def __str__(self) -> str:
+        return f'Entry(entry: {self.entry}, mechanism: {self.mechanism}, ec: {self.ec}, ' \
+               f'#overlay graphs: {self.overlay_graph_count})'
+
+    @property
+    def entry(self) -> int:
+        return self._entry
+
+    @property
+    def mechanism(self) -> int:
+        return self._mechanism
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return self._entry, self._mechanism
+
+    @property
+    def ec(self) -> Optional[ECNumber]:
+        return self._ec
+
+    @property
+    def overlay_graph_count(self) -> int:
+        return self._overlay_graph_count
+
+    @property
+    def location(self) -> Tuple[int, int]:
+        return self._location
+
+
+class ECIndexNode:
+    def __init__(self, levels: Tuple[str, ...]):
+        self._levels: Tuple[str, ...] = levels
+
+        self._children: Dict[str, ECIndexNode] = {}
+        self._positions: List[int] = []
+
+        self._entry_count: int = 0
+        self._overlay_graph_count: int = 0
+
+    @property
+    def ec(self) -> ECNumber:
+        return ECNumber(".".join(self._levels + ("-",) * (4 - len(self._levels))))
+
+    @property
+    def depth(self) -> int:
+        return len(self._levels)
+
+    @property
+    def level(self) -> str:
+        return self._levels[-1]
+
+    @property
+    def entry_count(self) -> int:
+        return self._entry_count
+
+    @property
+    def overlay_graph_count(self) -> int:
+        return self._overlay_graph_count
+
+    def child(self, level: str) -> 'ECIndexNode':
+        if level not in self._children:
+            self._children[level] = ECIndexNode(self._levels + (level,))
+
+        return self._children[level]
+
+    def sorted_children(self) -> List['ECIndexNode']:
+        return [self._children[level] for level in sorted(self._children, key=ec_level_key)]
+
+    def add(self, overlay_graph_count: int):
+        self._entry_count += 1
+        self._overlay_graph_count += overlay_graph_count
+
+    def add_position(self, position: int):
+        self._positions.append(position)
+
+    def positions(self) -> Iterable[int]:
+        yield from self._positions
+
+        for child in self.sorted_children():
+            yield from child.positions()
+
+
+class ECIndex:
+    def __init__(self, entries: Iterable[MCSAIndexEntry]):
+        self._root: ECIndexNode = ECIndexNode(tuple())
+
+        for position, entry in enumerate(entries):
+            if entry.ec is not None:
+                self._insert(position, entry)
+
+    @staticmethod
+    def _padded_levels(ec: ECNumber) -> Tuple[str, ...]:
+        levels = tuple(ec)[:4]
+
+        return levels + ("-",) * (4 - len(levels))
+
+    def _insert(self, position: int, entry: MCSAIndexEntry):
+        node = self._root
+        node.add(entry.overlay_graph_count)
+
+        for level in self._padded_levels(entry.ec):
+            node = node.child(level)
+            node.add(entry.overlay_graph_count)
+
+        node.add_position(position)
+
+    def _matching_nodes(self, node: ECIndexNode, levels: Tuple[str, ...]) -> Iterable[ECIndexNode]:
+        if all(level == "-" for level in levels[node.depth:]):
+            yield node
+            return
+
+        for child in node.sorted_children():
+            if levels[node.depth] == "-" or child.level == levels[node.depth]:
+                yield from self._matching_nodes(child, levels)
+
+    def positions(self, ec: Optional[ECNumber] = None) -> Iterable[int]:
+        if ec is None:
+            yield from self._root.positions()
+            return
+
+        for node in self._matching_nodes(self._root, self._padded_levels(ec)):
+            yield from node.positions()
+
+    def counts(self, level: int) -> Dict[ECNumber, Tuple[int, int]]:
+        nodes = [self._root]
+
+        for _ in range(level):
+            nodes = [child for node in nodes for child in node.sorted_children()]
+
+        return {node.ec: (node.entry_count, node.overlay_graph_count) for node in nodes}
+
+
+class MCSAEntries(Sequence[MCSAEntry]):
+    def __init__(self, database: 'MCSADB'):
+        self._database: MCSADB = database
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MCSAEntry, List[MCSAEntry]]:
+        if isinstance(index, slice):
+            return [self._database[position] for position in range(len(self._database))[index]]
+
+        return self._database[index]
+
+    def __iter__(self) -> Iterator[MCSAEntry]:
+        return iter(self._database)
+
+    def __len__(self) -> int:
+        return len(self._database)
+
+    def raw(self) -> Iterator[bytes]:
+        for position in range(len(self._database)):
+            yield self._database.raw_entry(position)
+
 
 class MCSADB:
-    def __init__(self, path: str, limit: int = 0):
-        with open(path) as file:
-            data = json.load(file)
+    def __init__(self, path: str, limit: int = 0, cache_size: int = 64, index_path: Optional[str] = None):
+        self._path: str = path
+        self._index_path: Optional[str] = index_path
+
+        self._json_file: Optional[BinaryIO] = None
+        self._binary_database: Optional[BinaryOverlayGraphDatabase] = None
+
+        self._cache: OrderedDict[Tuple[int, int], MCSAEntry] = OrderedDict()
+        self._cache_size: int = max(cache_size, 1)
+
+        if is_binary_database(path):
+            self._binary_database = BinaryOverlayGraphDatabase(path)
+            index = self._index_binary_database()
+        else:
+            self._json_file = open(path, "rb")
+            index = self._read_index_file()
+
+            if index is None:
+                index = self._index_json_database()
+
+                if limit <= 0 and self._index_path is not None:
+                    index = list(index)
+                    self._write_index_file(index)
+
+        if limit > 0:
+            index = islice(index, limit)
+
+        self._index: List[MCSAIndexEntry] = list(index)
+        self._positions: Dict[Tuple[int, int], int] = {entry.key: position for position, entry in
+                                                       enumerate(self._index)}
+
+        self._ec_index: Optional[ECIndex] = None
+
+    def __enter__(self) -> 'MCSADB':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return key in self._positions
+
+    def __getitem__(self, position: int) -> MCSAEntry:
+        return self._materialise(self._index[position])
+
+    def __iter__(self) -> Iterator[MCSAEntry]:
+        for index_entry in self._index:
+            yield self._materialise(index_entry)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def index(self) -> List[MCSAIndexEntry]:
+        return list(self._index)
+
+    @property
+    def entries(self) -> MCSAEntries:
+        return MCSAEntries(self)
+
+    @property
+    def ec_index(self) -> ECIndex:
+        if self._ec_index is None:
+            self._ec_index = ECIndex(self._index)
+
+        return self._ec_index
+
+    def _index_binary_database(self) -> Iterable[MCSAIndexEntry]:
+        for position in range(len(self._binary_database)):
+            entry, mechanism = self._binary_database.entry_key(position)
+            ec = self._binary_database.entry_ec(position)
+            graphs = self._binary_database.entry_graphs(position)
+
+            yield MCSAIndexEntry(entry, mechanism, ECNumber(ec) if ec is not None else None, len(graphs),
+                                 (position, position))
+
+    def _index_json_database(self) -> Iterable[MCSAIndexEntry]:
+        for start, end, entry_json in iterate_json_array(self._json_file):
+            mechanism_json = entry_json["mechanism"]
+            ec = mechanism_json.get("ec")
+
+            yield MCSAIndexEntry(mechanism_json["entry"], mechanism_json["proposal"],
+                                 ECNumber(ec) if ec is not None else None, len(entry_json["overlay_graphs"]),
+                                 (start, end))
+
+    def _index_file_stamp(self) -> Tuple[int, int]:
+        status = os.stat(self._path)
+
+        return status.st_size, status.st_mtime_ns
+
+    def _read_index_file(self) -> Optional[List[MCSAIndexEntry]]:
+        if self._index_path is None or not os.path.exists(self._index_path):
+            return None
+
+        with open(self._index_path, "r") as file:
+            index_json = json.load(file)
+
+        if index_json.get("version") != _index_version or tuple(index_json["stamp"]) != self._index_file_stamp():
+            return None
+
+        return [MCSAIndexEntry(entry, mechanism, ECNumber(ec) if ec is not None else None, overlay_graph_count,
+                               (start, end))
+                for entry, mechanism, ec, overlay_graph_count, start, end in index_json["entries"]]
+
+    def _write_index_file(self, index: List[MCSAIndexEntry]):
+        with open(self._index_path, "w") as file:
+            json.dump({"version": _index_version, "stamp": self._index_file_stamp(),
+                       "entries": [[index_entry.entry, index_entry.mechanism,
+                                    str(index_entry.ec) if index_entry.ec is not None else None,
+                                    index_entry.overlay_graph_count, *index_entry.location]
+                                   for index_entry in index]}, file)
+
+    def _load(self, index_entry: MCSAIndexEntry) -> MCSAEntry:
+        start, end = index_entry.location
+
+        if self._binary_database is not None:
+            return MCSAEntry(Mechanism.deserialise(self._binary_database.mechanism_json(start)),
+                             (self._binary_database.overlay_graph(graph) for graph in
+                              self._binary_database.entry_graphs(start)))
+
+        self._json_file.seek(start)
+        return MCSAEntry.deserialize(json.loads(self._json_file.read(end - start)))
+
+    def _load_raw(self, index_entry: MCSAIndexEntry) -> bytes:
+        start, end = index_entry.location
+
+        if self._binary_database is not None:
+            overlay_graphs = [self._binary_database.compact_overlay_graph(graph).serialise() for graph in
+                              self._binary_database.entry_graphs(start)]
+
+            return b"{\"mechanism\": " + self._binary_database.mechanism_data(start) + b", \"overlay_graphs\": " +\
+                json.dumps(overlay_graphs).encode("utf-8") + b"}"
+
+        self._json_file.seek(start)
+        return self._json_file.read(end - start)
+
+    def _materialise(self, index_entry: MCSAIndexEntry) -> MCSAEntry:
+        if index_entry.key in self._cache:
+            self._cache.move_to_end(index_entry.key)
+            return self._cache[index_entry.key]
+
+        entry = self._load(index_entry)
+
+        self._cache[index_entry.key] = entry
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return entry
+
+    def raw_entry(self, position: int) -> bytes:
+        return self._load_raw(self._index[position])
+
+    def get(self, entry: int, mechanism: int) -> MCSAEntry:
+        return self[self._positions[(entry, mechanism)]]
+
+    def index_entries_with_ec(self, ec: Optional[ECNumber] = None) -> List[MCSAIndexEntry]:
+        return [self._index[position] for position in self.ec_index.positions(ec)]
+
+    def entries_with_ec(self, ec: Optional[ECNumber] = None) -> Iterable[MCSAEntry]:
+        for position in self.ec_index.positions(ec):
+            yield self[position]
+
+    def ec_counts(self, level: int) -> Dict[ECNumber, Tuple[int, int]]:
+        return self.ec_index.counts(level)
+
+    def close(self):
+        self._cache.clear()
 
-        if limit <= 0:
-            limit = len(data)
+        if self._json_file is not None:
+            self._json_file.close()
 
-        self.entries: List[MCSAEntry] = [MCSAEntry.deserialize(entry_data) for entry_data in data[:limit]]
+        if self._binary_database is not None:
+            self._binary_database.close()
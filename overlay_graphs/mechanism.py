@@ -4,9 +4,20 @@ import mod
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
+def ec_level_key(level: str) -> Tuple[int, int, str]:
+    if level == "-":
+        return 0, 0, ""
+
+    if level.isnumeric():
+        return 1, int(level), ""
+
+    return 2, 0, level
+
+
 class ECNumber:
     def __init__(self, ec_id: str):
         self._levels: Tuple[str] = tuple(ec_id.split("."))
+        self._sort_key: Tuple[Tuple[int, int, str]] = tuple(ec_level_key(level) for level in self._levels[:4])
 
     def __eq__(self, other: 'ECNumber') -> bool:
         return self._levels == other._levels
@@ -24,28 +35,7 @@ class ECNumber:
         return self < other or self == other
 
     def __lt__(self, other: 'ECNumber') -> bool:
-        for i in range(0, 4):
-            if self._levels[i] == other._levels[i]:
-                continue
-
-            if self._levels[i] == "-":
-                return True
-
-            if other._levels[i] == "-":
-                return False
-
-            if self._levels[i].isnumeric():
-                if not other._levels[i].isnumeric():
-                    return True
-                if int(self._levels[i]) != int(other._levels[i]):
-                    return int(self._levels[i]) < int(other._levels[i])
-
-            if other._levels[i].isnumeric():
-                return False
-
-            return self._levels[i] < other._levels[i]
-
-        return False
+        return self._sort_key < other._sort_key
 
     def __iter__(self) -> Iterator[str]:
         return iter(self._levels)
@@ -63,19 +53,55 @@ class ECNumber:
     def __str__(self) -> str:
         return ".".join(self._levels)
 
+    @property
+    def sort_key(self) -> Tuple[Tuple[int, int, str]]:
+        return self._sort_key
+
     def abstract(self, level: int) -> 'ECNumber':
         return ECNumber(".".join(list(self._levels[:level]) + ["-"] * (4 - level)))
 
 
+class RuleLoadError:
+    def __init__(self, entry: int, mechanism: int, step: int, message: str):
+        self._entry: int = entry
+        self._mechanism: int = mechanism
+        self._step: int = step
+        self._message: str = message
+
+    def __str__(self) -> str:
+        return f'Step {self.entry}_{self.mechanism}_{self.step}: {self.message}'
+
+    @property
+    def entry(self) -> int:
+        return self._entry
+
+    @property
+    def mechanism(self) -> int:
+        return self._mechanism
+
+    @property
+    def step(self) -> int:
+        return self._step
+
+    @property
+    def message(self) -> str:
+        return self._message
+
+
 class Step:
-    def __init__(self, entry: int, mechanism: int, number: int, rule: Optional[mod.Rule] = None):
+    def __init__(self, entry: int, mechanism: int, number: int, rule: Optional[mod.Rule] = None,
+                 gml: Optional[str] = None):
         self._entry: int = entry
         self._mechanism: int = mechanism
         self._number: int = number
         self._rule: Optional[mod.Rule] = rule
+        self._gml: Optional[str] = gml
 
         self._components: List[str] = []
 
+        self._load_error: Optional[RuleLoadError] = None
+        self._verbosity: int = 0
+
     def __str__(self):
         rule_name = self.rule.name if self.rule is not None else "None"
         return f'entry: {self.entry}, mechanism: {self.mechanism}, step: {self.number}, rule: {rule_name}'
@@ -94,8 +120,43 @@ class Step:
 
     @property
     def rule(self) -> Optional[mod.Rule]:
+        self.load()
+
         return self._rule
 
+    @property
+    def gml(self) -> Optional[str]:
+        if self._gml is None and self._rule is not None:
+            return self._rule.getGMLString()
+
+        return self._gml
+
+    @property
+    def rule_loaded(self) -> bool:
+        return self._rule is not None
+
+    @property
+    def load_error(self) -> Optional[RuleLoadError]:
+        return self._load_error
+
+    def load(self) -> bool:
+        if self._rule is None and self._gml is not None:
+            try:
+                self._rule = mod.ruleGMLString(self._gml, add=False)
+            except mod.InputError as error:
+                self.set_load_error(str(error))
+
+        return self._load_error is None
+
+    def set_load_error(self, message: str):
+        self._rule = None
+        self._gml = None
+
+        self._load_error = RuleLoadError(self.entry, self.mechanism, self.number, message)
+
+        if self._verbosity > 0:
+            print(f"#\tError loading gml rule for Step {self.entry}_{self.mechanism}_{self.number}: '{message}'")
+
     @property
     def components(self):
         return self._components
@@ -103,13 +164,10 @@ class Step:
     @staticmethod
     def deserialise(json_object: Dict[str, Any], load_rule: bool = True, verbosity: int = 0) -> 'Step':
         step = Step(json_object["entry"], json_object["proposal"], json_object["step"])
+        step._verbosity = verbosity
 
         if load_rule and "gml" in json_object:
-            try:
-                step._rule = mod.ruleGMLString(json_object["gml"], add=False)
-            except mod.InputError as error:
-                if verbosity > 0:
-                    print(f"#\tError loading gml rule for Step {step.entry}_{step.mechanism}_{step.number}: '{error}'")
+            step._gml = json_object["gml"]
 
         if "components" in json_object:
             for component in json_object["components"]:
@@ -120,6 +178,15 @@ class Step:
     def add_component(self, component: str):
         self._components.append(component)
 
+    def release_rule(self):
+        if self._rule is None:
+            return
+
+        if self._gml is None:
+            self._gml = self._rule.getGMLString()
+
+        self._rule = None
+
     def serialise(self) -> Dict[str, Any]:
         json_object = {
             'entry': self.entry,
@@ -127,8 +194,9 @@ class Step:
             'step': self.number
         }
 
-        if self.rule is not None:
-            json_object["gml"] = self.rule.getGMLString()
+        gml = self.gml
+        if gml is not None:
+            json_object["gml"] = gml
 
         if len(self._components) > 0:
             json_object["components"] = self._components
@@ -1,8 +1,12 @@
 import mod
 import networkx as nx
+import weakref
 
 
-from typing import Any, Callable, Dict, Iterable, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+
+_rule_structures: 'weakref.WeakKeyDictionary[mod.Rule, Dict[str, Any]]' = weakref.WeakKeyDictionary()
 
 
 def _get_rule_element_label(element: Union[mod.Rule.LeftGraph.Vertex, mod.Rule.RightGraph.Vertex,
@@ -28,10 +32,6 @@ def _connect_labelled_edge_in_nx_graph(edge: Union[mod.Graph.Edge, mod.Rule.Edge
     return index + 1
 
 
-def _nx_graph_to_mod(graph: nx.Graph, node_dereference: Callable[[Any], int]) -> mod.Graph:
-    return mod.graphGMLString(nx_graph_to_gml(graph, node_dereference))
-
-
 def graph_to_nx_graph(graph: Union[mod.Graph, mod.Rule.LeftGraph, mod.Rule.RightGraph],
                       relabel: Callable[[str], str] = lambda x: x, use_indices: bool = False) -> nx.Graph:
     nx_graph = nx.Graph()
@@ -60,6 +60,26 @@ def graph_to_unlabeled_edge_nx_graph(graph: mod.Graph, relabel: Callable[[str],
     return nx_graph
 
 
+def nx_graph_to_unlabeled_edge_nx_graph(graph: nx.Graph, relabel: Callable[[str], str] = lambda x: x) -> nx.Graph:
+    nx_graph = nx.Graph()
+
+    node_indices = {}
+    for index, (node, data) in enumerate(graph.nodes(data=True)):
+        nx_graph.add_node(index, label=relabel(data["label"]))
+        node_indices[node] = index
+
+    vertex_count = len(node_indices)
+
+    for source, target, data in graph.edges(data=True):
+        nx_graph.add_node(vertex_count, label=relabel(data["label"]))
+        nx_graph.add_edge(node_indices[source], vertex_count, label='-')
+        nx_graph.add_edge(vertex_count, node_indices[target], label='-')
+
+        vertex_count += 1
+
+    return nx_graph
+
+
 def rule_combined_graph_to_nx_graph(rule: mod.Rule) -> nx.Graph:
     graph = nx.Graph()
 
@@ -95,11 +115,26 @@ def nx_graph_to_gml(graph: nx.Graph, node_dereference: Callable[[Any], int] = la
     return '\n'.join(out)
 
 
-def get_component_graphs(graph: nx.Graph, node_dereference: Callable[[Any], int] = lambda x: x) ->\
-        Dict[mod.Graph, nx.Graph]:
-    molecules = [graph.subgraph(c).copy() for c in nx.connected_components(graph)]
+def get_components(graph: nx.Graph) -> List[nx.Graph]:
+    return [graph.subgraph(component).copy() for component in nx.connected_components(graph)]
+
+
+def nx_graph_to_mod_graph(graph: nx.Graph, node_dereference: Callable[[Any], int] = lambda x: x,
+                          cache: Optional[Dict[str, mod.Graph]] = None) -> mod.Graph:
+    gml = nx_graph_to_gml(graph, node_dereference)
+
+    if cache is None:
+        return mod.graphGMLString(gml)
+
+    if gml not in cache:
+        cache[gml] = mod.graphGMLString(gml)
 
-    return {_nx_graph_to_mod(molecule, node_dereference): molecule for molecule in molecules}
+    return cache[gml]
+
+
+def get_component_graphs(graph: nx.Graph, node_dereference: Callable[[Any], int] = lambda x: x,
+                         cache: Optional[Dict[str, mod.Graph]] = None) -> Dict[mod.Graph, nx.Graph]:
+    return {nx_graph_to_mod_graph(molecule, node_dereference, cache): molecule for molecule in get_components(graph)}
 
 
 def get_rule_component_graphs_with_nx(rule_graph: Union[mod.Rule.LeftGraph, mod.Rule.RightGraph],
@@ -112,3 +147,35 @@ def get_rule_component_graphs_with_nx(rule_graph: Union[mod.Rule.LeftGraph, mod.
 def get_rule_component_graphs(rule_graph: Union[mod.Rule.LeftGraph, mod.Rule.RightGraph],
                               relabel: Callable[[str], str] = lambda x: x) -> Iterable[mod.Graph]:
     return get_rule_component_graphs_with_nx(rule_graph, relabel).keys()
+
+
+def _rule_structure(rule: mod.Rule, key: str, compute: Callable[[], Any]) -> Any:
+    try:
+        structures = _rule_structures.setdefault(rule, {})
+    except TypeError:
+        return compute()
+
+    if key not in structures:
+        structures[key] = compute()
+
+    return structures[key]
+
+
+def rule_left_nx_graph(rule: mod.Rule) -> nx.Graph:
+    return _rule_structure(rule, "left", lambda: graph_to_nx_graph(rule.left, use_indices=True))
+
+
+def rule_right_nx_graph(rule: mod.Rule) -> nx.Graph:
+    return _rule_structure(rule, "right", lambda: graph_to_nx_graph(rule.right, use_indices=True))
+
+
+def rule_combined_nx_graph(rule: mod.Rule) -> nx.Graph:
+    return _rule_structure(rule, "combined", lambda: rule_combined_graph_to_nx_graph(rule))
+
+
+def rule_left_component_graphs(rule: mod.Rule) -> Dict[mod.Graph, nx.Graph]:
+    return dict(_rule_structure(rule, "left_components", lambda: get_rule_component_graphs_with_nx(rule.left)))
+
+
+def rule_right_component_graphs(rule: mod.Rule) -> Dict[mod.Graph, nx.Graph]:
+    return dict(_rule_structure(rule, "right_components", lambda: get_rule_component_graphs_with_nx(rule.right)))
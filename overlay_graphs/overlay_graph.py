@@ -1,20 +1,31 @@
 import mod
 import networkx as nx
+import numpy as np
 import re
 
 
-from overlay_graphs.networkx_converter import get_component_graphs
+from itertools import chain
+from overlay_graphs.canonicalisation import canonical_graph_digest
+from overlay_graphs.catalysis import EnzymeComponentMatcher, shared_enzyme_component_matcher
 from overlay_graphs.rule_builder import EdgeTuple
-from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 
 _atom_label_pattern: re.Pattern = re.compile(r"^[\s]*([a-zA-Z]+)([0-9]*)([+\-]*)[\s]*$")
 
 
 _edge_valence_symbols = ["?", "-", "=", "#", ":", ">"]
+_edge_valences: Dict[str, int] = {symbol: valence for valence, symbol in enumerate(_edge_valence_symbols)}
 
+_atom_labels: Dict[str, Tuple[str, int]] = {}
 
-def _parse_atom_label(label: str) -> (str, int):
+_invalid_product_message = "Overlay graph has an unknown bond label or a marking that yields an invalid bond valence"
+
+_wl_hash_iterations = 4
+_wl_hash_size = 16
+
+
+def _match_atom_label(label: str) -> (str, int):
     match = _atom_label_pattern.match(label)
     if match is None:
         return label, 0
@@ -35,6 +46,13 @@ def _parse_atom_label(label: str) -> (str, int):
     return atom_type, charge
 
 
+def _parse_atom_label(label: str) -> (str, int):
+    if label not in _atom_labels:
+        _atom_labels[label] = _match_atom_label(label)
+
+    return _atom_labels[label]
+
+
 def _compose_atom_label(atom_type: str, charge: int) -> str:
     if charge != 0:
         if charge < 0:
@@ -50,16 +68,87 @@ def _compose_atom_label(atom_type: str, charge: int) -> str:
     return f"{atom_type}{charge_label}"
 
 
+def _label_arrays(labels: List[str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    parsed = [_parse_atom_label(label) for label in labels]
+
+    atom_types = [atom_type for atom_type, charge in parsed]
+    charges = np.array([charge for atom_type, charge in parsed], dtype=np.int64)
+
+    return atom_types, charges, np.array([_edge_valences.get(label, -1) for label in labels], dtype=np.int64)
+
+
+def _product_arrays(labels: List[str], node_labels: np.ndarray, node_balance: np.ndarray, edge_labels: np.ndarray,
+                    edge_balance: np.ndarray) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    atom_types, charges, valences = _label_arrays(labels)
+
+    pairs, inverse = np.unique(np.stack((node_labels, charges[node_labels] - node_balance), axis=1), axis=0,
+                               return_inverse=True)
+    composed = [_compose_atom_label(atom_types[label], charge) for label, charge in pairs.tolist()]
+
+    edge_valences = valences[edge_labels] + edge_balance
+    invalid = (valences[edge_labels] < 0) | (edge_valences < 0) | (edge_valences >= len(_edge_valence_symbols))
+
+    return [composed[index] for index in inverse.reshape(-1).tolist()], edge_valences, invalid
+
+
+class LabelPatternFormatter:
+    _placeholders: Dict[str, str] = {"{": "{{", "}": "}}", "-": "{0}", "+": "{1}", "b": "{2}"}
+
+    def __init__(self, label_pattern: str):
+        self._label_pattern: str = label_pattern
+        self._template: str = "".join("{3}" if character == "L" else self._placeholders.get(character, character)
+                                      for character in label_pattern)
+
+        self._label_templates: Dict[str, str] = {}
+        self._labels: Dict[Tuple[str, int, int], str] = {}
+
+    @property
+    def label_pattern(self) -> str:
+        return self._label_pattern
+
+    def _label_template(self, original_label: str) -> str:
+        if original_label not in self._label_templates:
+            self._label_templates[original_label] = "".join(self._placeholders.get(character, character)
+                                                            for character in original_label)
+
+        return self._label_templates[original_label]
+
+    def format(self, original_label: str, electrons_donated: int, electrons_received: int) -> str:
+        key = (original_label, electrons_donated, electrons_received)
+
+        if key not in self._labels:
+            arguments = (electrons_donated, electrons_received, electrons_received - electrons_donated)
+
+            label = self._label_template(original_label).format(*arguments)
+
+            self._labels[key] = self._template.format(*arguments, label)
+
+        return self._labels[key]
+
+
+_label_formatters: Dict[str, LabelPatternFormatter] = {}
+
+
+def label_pattern_formatter(label_pattern: str) -> LabelPatternFormatter:
+    if label_pattern not in _label_formatters:
+        _label_formatters[label_pattern] = LabelPatternFormatter(label_pattern)
+
+    return _label_formatters[label_pattern]
+
+
 class OverlayGraph:
-    def __init__(self, graph: nx.Graph, marking: Dict[Union[int, Tuple[int, int]], Tuple[int, int]]):
+    def __init__(self, graph: nx.Graph, marking: Dict[Union[int, Tuple[int, int]], Tuple[int, int]],
+                 digest: Optional[str] = None):
         self._host_graph: nx.Graph = graph
         self._marking: Dict[Union[int, EdgeTuple], Tuple[int, int]] =\
             {self._canonicalise_element(key): value for key, value in marking.items()}
 
         self._product_graph: Optional[nx.Graph] = None
+        self._digest: Optional[str] = digest
+        self._wl_hash: Optional[str] = None
 
     def __copy__(self) -> 'OverlayGraph':
-        return OverlayGraph(self.host_graph, dict(self._marking))
+        return OverlayGraph(self.host_graph, dict(self._marking), self._digest)
 
     @property
     def host_graph(self) -> nx.Graph:
@@ -68,28 +157,68 @@ class OverlayGraph:
     @property
     def product_graph(self) -> nx.Graph:
         if self._product_graph is None:
+            host_graph = self.host_graph
+            node_count = host_graph.number_of_nodes()
+            edge_count = host_graph.number_of_edges()
+
+            labels: Dict[str, int] = {}
+            node_labels = np.fromiter((labels.setdefault(label, len(labels))
+                                       for node, label in host_graph.nodes(data="label")), np.int64, node_count)
+            edge_labels = np.fromiter((labels.setdefault(label, len(labels))
+                                       for source, target, label in host_graph.edges(data="label")), np.int64,
+                                      edge_count)
+
+            node_balance = np.fromiter((received - donated for received, donated in
+                                        (self._marking.get(node, (0, 0)) for node in host_graph.nodes)), np.int64,
+                                       node_count)
+            edge_balance = np.fromiter((received - donated for received, donated in
+                                        (self._marking.get(EdgeTuple(edge), (0, 0)) for edge in host_graph.edges)),
+                                       np.int64, edge_count)
+
+            product_labels, edge_valences, invalid = _product_arrays(list(labels), node_labels, node_balance,
+                                                                     edge_labels, edge_balance)
+
+            if np.any(invalid):
+                raise ValueError(_invalid_product_message)
+
             self._product_graph = nx.Graph()
+            self._product_graph.add_nodes_from((node, {"label": label})
+                                               for node, label in zip(host_graph.nodes, product_labels))
+            self._product_graph.add_edges_from((source, target, {"label": _edge_valence_symbols[valence]})
+                                               for (source, target), valence in zip(host_graph.edges,
+                                                                                    edge_valences.tolist()))
 
-            for node, data in self.host_graph.nodes(data=True):
-                atom_type, charge = _parse_atom_label(data["label"])
+        return self._product_graph
 
-                electron_balance = self.electrons_received(node) - self.electrons_donated(node)
+    @property
+    def action(self) -> Iterable[Union[int, EdgeTuple]]:
+        return self._marking
 
-                self._product_graph.add_node(node, label=_compose_atom_label(atom_type, charge - electron_balance))
+    def _digest_graph(self) -> nx.Graph:
+        digest_graph = nx.Graph()
 
-            for source, target, data in self.host_graph.edges(data=True):
-                edge_tuple = EdgeTuple((source, target))
+        digest_graph.add_nodes_from((node, {"label": f"V{data['label']}_{self._marking.get(node, (0, 0))}"})
+                                    for node, data in self.host_graph.nodes(data=True))
+        digest_graph.add_edges_from(
+            (source, target, {"label": f"E{data['label']}_{self._marking.get(EdgeTuple((source, target)), (0, 0))}"})
+            for source, target, data in self.host_graph.edges(data=True))
 
-                valence = _edge_valence_symbols.index(data["label"])
-                electron_balance = self.electrons_received(edge_tuple) - self.electrons_donated(edge_tuple)
+        return digest_graph
 
-                self._product_graph.add_edge(source, target, label=_edge_valence_symbols[valence + electron_balance])
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = canonical_graph_digest(self._digest_graph())
 
-        return self._product_graph
+        return self._digest
 
     @property
-    def action(self) -> Iterable[Union[int, EdgeTuple]]:
-        return self._marking
+    def wl_hash(self) -> str:
+        if self._wl_hash is None:
+            self._wl_hash = nx.weisfeiler_lehman_graph_hash(self._digest_graph(), edge_attr="label", node_attr="label",
+                                                            iterations=_wl_hash_iterations, digest_size=_wl_hash_size)
+
+        return self._wl_hash
 
     @staticmethod
     def _canonicalise_element(element: Union[int, Tuple[int, int]]) -> Union[int, EdgeTuple]:
@@ -122,7 +251,7 @@ class OverlayGraph:
             host_graph.add_edge(edge["src"], edge["tar"], label=edge["label"], electrons_donated=donated,
                                 electrons_received=received)
 
-        return OverlayGraph(host_graph, marking)
+        return OverlayGraph(host_graph, marking, og_json.get("digest"))
 
     def _og_marking(self, element: Union[int, EdgeTuple], add: bool) -> Tuple[int, int]:
         if add:
@@ -139,10 +268,7 @@ class OverlayGraph:
         if not include_blue and electrons_donated == electrons_received:
             electrons_donated, electrons_received = 0, 0
 
-        label = re.sub(r"L", original_label, label_pattern)
-        label = re.sub(r"-", str(electrons_donated), label)
-        label = re.sub(r"\+", str(electrons_received), label)
-        return re.sub(r"b", str(electrons_received - electrons_donated), label)
+        return label_pattern_formatter(label_pattern).format(original_label, electrons_donated, electrons_received)
 
     def marking_key(self) -> frozenset[Tuple[Union[int, EdgeTuple], Tuple[int, int]]]:
         return frozenset([(k, v) for k, v in self._marking.items()])
@@ -160,12 +286,16 @@ class OverlayGraph:
         received, donated = self._og_marking(element, True)
 
         self._marking[element] = (received + 1, donated)
+        self._digest = None
+        self._wl_hash = None
 
     def add_donated(self, element: Union[int, Tuple[int, int]]):
         element = self._canonicalise_element(element)
         received, donated = self._og_marking(element, True)
 
         self._marking[element] = (received, donated + 1)
+        self._digest = None
+        self._wl_hash = None
 
     def remove_received(self, element: Union[int, Tuple[int, int]]):
         element = self._canonicalise_element(element)
@@ -174,6 +304,8 @@ class OverlayGraph:
         assert (received > 0)
 
         self._marking[element] = (received - 1, donated)
+        self._digest = None
+        self._wl_hash = None
 
     def remove_donated(self, element: Union[int, Tuple[int, int]]):
         element = self._canonicalise_element(element)
@@ -182,6 +314,8 @@ class OverlayGraph:
         assert (donated > 0)
 
         self._marking[element] = (received, donated - 1)
+        self._digest = None
+        self._wl_hash = None
 
     def serialise(self) -> Dict[str, Any]:
         return {
@@ -197,54 +331,20 @@ class OverlayGraph:
                 "label": data["label"],
                 "electrons_donated": self.electrons_donated((source, target)),
                 "electrons_received": self.electrons_received((source, target))
-            } for source, target, data in self.host_graph.edges(data=True)]
+            } for source, target, data in self.host_graph.edges(data=True)],
+            "digest": self.digest
         }
 
-    def catalytic_vertices(self):
-        label_settings = mod.LabelSettings(mod.LabelType.String, mod.LabelRelation.Isomorphism)
+    def catalytic_vertices(self, matcher: Optional[EnzymeComponentMatcher] = None) -> Set[int]:
+        if matcher is None:
+            matcher = shared_enzyme_component_matcher()
 
         left = nx.subgraph_view(self.host_graph,
                                 filter_edge=lambda src, tar: self.host_graph.edges[src, tar]["label"] != "?")
         right = nx.subgraph_view(self.product_graph,
                                  filter_edge=lambda src, tar: self.product_graph.edges[src, tar]["label"] != "?")
-        left_graphs = get_component_graphs(left)
-        right_graphs = get_component_graphs(right)
-
-        left_enzyme_components = []
-        right_enzyme_components = []
-        for left_graph, left_nx in left_graphs.items():
-            isomorphic_right_graphs = {graph: [node for node in left_nx.nodes if node in right_graphs[graph].nodes]
-                                       for graph in right_graphs
-                                       if graph.isomorphism(left_graph, labelSettings=label_settings) != 0 and
-                                       graph not in right_enzyme_components}
-            print(left_nx.nodes)
-            print(len(isomorphic_right_graphs))
-            print(right_enzyme_components)
-
-            for graph in list(isomorphic_right_graphs):
-                if len(isomorphic_right_graphs[graph]) == 0:
-                    del isomorphic_right_graphs[graph]
-
-            if len(isomorphic_right_graphs) == 0:
-                continue
-
-            for right_graph in sorted(isomorphic_right_graphs, key=lambda g: len(isomorphic_right_graphs[g]),
-                                      reverse=True):
-                if len(isomorphic_right_graphs[right_graph]) > left_graph.numVertices / 2 or \
-                        any(left_nx.nodes[node]["label"] != "H" for node in isomorphic_right_graphs[right_graph]):
-
-                    left_enzyme_components.append(left_graph)
-                    right_enzyme_components.append(right_graph)
-                    break
-        left_enzyme_vertices = set()
-        for component in left_enzyme_components:
-            left_enzyme_vertices.update(node for node in left_graphs[component].nodes)
-        print("LEFT: ", left_enzyme_vertices)
-
-        right_enzyme_vertices = set()
-        for component in right_enzyme_components:
-            right_enzyme_vertices.update(node for node in right_graphs[component].nodes)
-        print("RIGHT: ", left_enzyme_vertices)
+
+        left_enzyme_vertices, right_enzyme_vertices = matcher.enzyme_vertices(left, right)
 
         return left_enzyme_vertices.intersection(right_enzyme_vertices)
 
@@ -266,17 +366,22 @@ class OverlayGraph:
             og_marking = self._og_marking(EdgeTuple((source, target)), False)
             marking[new_edge] = og_marking
 
-        return OverlayGraph(new_graph, marking)
+        return OverlayGraph(new_graph, marking, self._digest)
 
     def to_labelled_graph(self, vertex_label_pattern: str, edge_label_pattern: str) -> nx.Graph:
-        labelled_graph = self.host_graph.copy()
+        vertex_formatter = label_pattern_formatter(vertex_label_pattern)
+        edge_formatter = label_pattern_formatter(edge_label_pattern)
 
-        for node, data in self.host_graph.nodes(data=True):
-            labelled_graph.nodes[node]["label"] = self._apply_label_pattern(vertex_label_pattern, data["label"], node)
+        labelled_graph = nx.Graph()
+        labelled_graph.graph.update(self.host_graph.graph)
 
-        for source, target, data in self.host_graph.edges(data=True):
-            labelled_graph.edges[source, target]["label"] = self._apply_label_pattern(edge_label_pattern, data["label"],
-                                                                                      EdgeTuple((source, target)))
+        labelled_graph.add_nodes_from(
+            (node, {**data, "label": vertex_formatter.format(data["label"], *self._marking.get(node, (0, 0)))})
+            for node, data in self.host_graph.nodes(data=True))
+        labelled_graph.add_edges_from(
+            (source, target, {**data, "label": edge_formatter.format(
+                data["label"], *self._marking.get(EdgeTuple((source, target)), (0, 0)))})
+            for source, target, data in self.host_graph.edges(data=True))
 
         return labelled_graph
 
@@ -317,3 +422,331 @@ class OverlayGraph:
             return mod.graphGMLString(self.to_gml(vertex_label_pattern, edge_label_pattern, include_blue))
         except mod.InputError:
             return None
+
+
+class CompactOverlayGraph:
+    def __init__(self, node_ids: np.ndarray, node_labels: np.ndarray, edge_sources: np.ndarray,
+                 edge_targets: np.ndarray, edge_labels: np.ndarray, labels: List[str], node_received: np.ndarray,
+                 node_donated: np.ndarray, edge_received: np.ndarray, edge_donated: np.ndarray,
+                 node_marked: Optional[np.ndarray] = None, edge_marked: Optional[np.ndarray] = None,
+                 digest: Optional[str] = None):
+        self._labels: List[str] = labels
+        self._digest: Optional[str] = digest
+
+        self._node_ids: np.ndarray = np.asarray(node_ids, dtype=np.int64)
+        self._node_labels: np.ndarray = np.asarray(node_labels, dtype=np.int64)
+        self._node_received: np.ndarray = np.asarray(node_received, dtype=np.int64)
+        self._node_donated: np.ndarray = np.asarray(node_donated, dtype=np.int64)
+
+        if node_marked is None:
+            node_marked = (self._node_received > 0) | (self._node_donated > 0)
+
+        self._node_marked: np.ndarray = np.asarray(node_marked, dtype=bool)
+
+        self._node_order: np.ndarray = np.argsort(self._node_ids, kind="stable")
+        self._sorted_node_ids: np.ndarray = self._node_ids[self._node_order]
+
+        edge_sources = np.asarray(edge_sources, dtype=np.int64)
+        edge_targets = np.asarray(edge_targets, dtype=np.int64)
+
+        sources = np.minimum(edge_sources, edge_targets)
+        targets = np.maximum(edge_sources, edge_targets)
+        order = np.lexsort((targets, sources))
+
+        self._edge_sources: np.ndarray = sources[order]
+        self._edge_targets: np.ndarray = targets[order]
+        self._edge_keys: np.ndarray = self._edge_sources * self.node_count + self._edge_targets
+
+        self._edge_labels: np.ndarray = np.asarray(edge_labels, dtype=np.int64)[order]
+        self._edge_received: np.ndarray = np.asarray(edge_received, dtype=np.int64)[order]
+        self._edge_donated: np.ndarray = np.asarray(edge_donated, dtype=np.int64)[order]
+
+        if edge_marked is None:
+            self._edge_marked: np.ndarray = (self._edge_received > 0) | (self._edge_donated > 0)
+        else:
+            self._edge_marked: np.ndarray = np.asarray(edge_marked, dtype=bool)[order]
+
+        self._product_graph: Optional[nx.Graph] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self._node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_keys)
+
+    @property
+    def labels(self) -> List[str]:
+        return self._labels
+
+    @property
+    def digest(self) -> Optional[str]:
+        return self._digest
+
+    @property
+    def node_ids(self) -> np.ndarray:
+        return self._node_ids
+
+    @property
+    def node_labels(self) -> np.ndarray:
+        return self._node_labels
+
+    @property
+    def edge_labels(self) -> np.ndarray:
+        return self._edge_labels
+
+    @property
+    def edge_endpoints(self) -> np.ndarray:
+        return np.stack((self._node_ids[self._edge_sources], self._node_ids[self._edge_targets]), axis=1)
+
+    @property
+    def node_balance(self) -> np.ndarray:
+        return self._node_received - self._node_donated
+
+    @property
+    def edge_balance(self) -> np.ndarray:
+        return self._edge_received - self._edge_donated
+
+    @property
+    def invalid_valences(self) -> np.ndarray:
+        return self._product_arrays()[2]
+
+    @property
+    def product_graph(self) -> nx.Graph:
+        if self._product_graph is None:
+            node_labels, edge_valences, invalid = self._product_arrays()
+
+            if np.any(invalid):
+                raise ValueError(_invalid_product_message)
+
+            self.cache_product_graph(node_labels, edge_valences)
+
+        return self._product_graph
+
+    def cache_product_graph(self, node_labels: List[str], edge_valences: np.ndarray) -> nx.Graph:
+        if self._product_graph is None:
+            self._product_graph = self._to_nx_graph(node_labels, edge_valences)
+
+        return self._product_graph
+
+    @staticmethod
+    def from_overlay_graph(overlay_graph: OverlayGraph) -> 'CompactOverlayGraph':
+        host_graph = overlay_graph.host_graph
+
+        node_count = host_graph.number_of_nodes()
+        edge_count = host_graph.number_of_edges()
+
+        node_ids = np.fromiter(host_graph.nodes, dtype=np.int64, count=node_count)
+        endpoints = np.fromiter(chain.from_iterable(host_graph.edges), dtype=np.int64, count=2 * edge_count)
+
+        node_order = np.argsort(node_ids, kind="stable")
+        positions = node_order[np.searchsorted(node_ids[node_order], endpoints)] if node_count > 0 else endpoints
+
+        labels, label_indices = np.unique(np.array(
+            [label for node, label in host_graph.nodes(data="label")] +
+            [label for source, target, label in host_graph.edges(data="label")], dtype=object), return_inverse=True)
+        label_indices = label_indices.reshape(-1)
+
+        compact = CompactOverlayGraph(node_ids, label_indices[:node_count], positions[0::2], positions[1::2],
+                                      label_indices[node_count:], labels.tolist(),
+                                      np.zeros(node_count, dtype=np.int64), np.zeros(node_count, dtype=np.int64),
+                                      np.zeros(edge_count, dtype=np.int64), np.zeros(edge_count, dtype=np.int64),
+                                      np.zeros(node_count, dtype=bool), np.zeros(edge_count, dtype=bool))
+
+        marking = overlay_graph.marking_key()
+        compact._mark(np.array([(node, *electrons) for node, electrons in marking if isinstance(node, int)],
+                               dtype=np.int64).reshape(-1, 3),
+                      np.array([(*edge, *electrons) for edge, electrons in marking if not isinstance(edge, int)],
+                               dtype=np.int64).reshape(-1, 4))
+
+        return compact
+
+    @staticmethod
+    def from_arrays(arrays: Any) -> 'CompactOverlayGraph':
+        return CompactOverlayGraph(arrays.node_ids, arrays.node_labels, arrays.edge_sources, arrays.indices,
+                                   arrays.edge_labels, arrays.labels, arrays.node_received, arrays.node_donated,
+                                   arrays.edge_received, arrays.edge_donated, digest=arrays.digest)
+
+    def _node_positions(self, nodes: np.ndarray) -> np.ndarray:
+        nodes = np.asarray(nodes, dtype=np.int64)
+
+        indices = np.minimum(np.searchsorted(self._sorted_node_ids, nodes), max(self.node_count - 1, 0))
+        if self.node_count == 0:
+            return np.full(nodes.shape, -1, dtype=np.int64)
+
+        return np.where(self._sorted_node_ids[indices] == nodes, self._node_order[indices], -1)
+
+    def _edge_indices(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        source_positions = self._node_positions(sources)
+        target_positions = self._node_positions(targets)
+
+        keys = np.minimum(source_positions, target_positions) * self.node_count +\
+            np.maximum(source_positions, target_positions)
+
+        if self.edge_count == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+
+        indices = np.minimum(np.searchsorted(self._edge_keys, keys), self.edge_count - 1)
+        found = (self._edge_keys[indices] == keys) & (source_positions >= 0) & (target_positions >= 0)
+
+        return np.where(found, indices, -1)
+
+    def _mark(self, nodes: np.ndarray, edges: np.ndarray):
+        positions = self._node_positions(nodes[:, 0])
+        found = positions >= 0
+
+        self._node_received[positions[found]] = nodes[found, 1]
+        self._node_donated[positions[found]] = nodes[found, 2]
+        self._node_marked[positions[found]] = True
+
+        indices = self._edge_indices(edges[:, 0], edges[:, 1])
+        found = indices >= 0
+
+        self._edge_received[indices[found]] = edges[found, 2]
+        self._edge_donated[indices[found]] = edges[found, 3]
+        self._edge_marked[indices[found]] = True
+
+    def _element_marking(self, element: Union[int, Tuple[int, int]]) -> Tuple[int, int]:
+        if isinstance(element, (int, np.integer)):
+            position = int(self._node_positions(np.array([element]))[0])
+
+            return (int(self._node_received[position]), int(self._node_donated[position])) if position >= 0 else (0, 0)
+
+        index = int(self._edge_indices(np.array([element[0]]), np.array([element[1]]))[0])
+
+        return (int(self._edge_received[index]), int(self._edge_donated[index])) if index >= 0 else (0, 0)
+
+    def electrons_received(self, element: Union[int, Tuple[int, int]]) -> int:
+        return self._element_marking(element)[0]
+
+    def electrons_donated(self, element: Union[int, Tuple[int, int]]) -> int:
+        return self._element_marking(element)[1]
+
+    def node_electrons(self, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        positions = self._node_positions(nodes)
+        found = positions >= 0
+
+        return np.where(found, self._node_received[positions], 0), np.where(found, self._node_donated[positions], 0)
+
+    def edge_electrons(self, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        indices = self._edge_indices(sources, targets)
+        found = indices >= 0
+
+        return np.where(found, self._edge_received[indices], 0), np.where(found, self._edge_donated[indices], 0)
+
+    def _product_arrays(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        return _product_arrays(self._labels, self._node_labels, self.node_balance, self._edge_labels, self.edge_balance)
+
+    def _to_nx_graph(self, node_labels: List[str], edge_valences: np.ndarray) -> nx.Graph:
+        graph = nx.Graph()
+
+        node_ids = self._node_ids.tolist()
+
+        graph.add_nodes_from((node, {"label": label}) for node, label in zip(node_ids, node_labels))
+        graph.add_edges_from((node_ids[source], node_ids[target], {"label": _edge_valence_symbols[valence]})
+                             for source, target, valence in zip(self._edge_sources.tolist(),
+                                                                self._edge_targets.tolist(), edge_valences.tolist()))
+
+        return graph
+
+    def reindex(self) -> 'CompactOverlayGraph':
+        return CompactOverlayGraph(np.arange(self.node_count, dtype=np.int64), self._node_labels, self._edge_sources,
+                                   self._edge_targets, self._edge_labels, self._labels, self._node_received,
+                                   self._node_donated, self._edge_received, self._edge_donated,
+                                   np.ones(self.node_count, dtype=bool), np.ones(self.edge_count, dtype=bool),
+                                   self._digest)
+
+    def serialise(self) -> Dict[str, Any]:
+        node_ids = self._node_ids.tolist()
+
+        og_json = {
+            "nodes": [{
+                "id": node,
+                "label": self._labels[label],
+                "electrons_donated": donated,
+                "electrons_received": received
+            } for node, label, donated, received in zip(node_ids, self._node_labels.tolist(),
+                                                        self._node_donated.tolist(), self._node_received.tolist())],
+            "edges": [{
+                "src": node_ids[source],
+                "tar": node_ids[target],
+                "label": self._labels[label],
+                "electrons_donated": donated,
+                "electrons_received": received
+            } for source, target, label, donated, received in zip(self._edge_sources.tolist(),
+                                                                  self._edge_targets.tolist(),
+                                                                  self._edge_labels.tolist(),
+                                                                  self._edge_donated.tolist(),
+                                                                  self._edge_received.tolist())]
+        }
+
+        if self._digest is not None:
+            og_json["digest"] = self._digest
+
+        return og_json
+
+    def to_overlay_graph(self) -> OverlayGraph:
+        host_graph = nx.Graph()
+
+        node_ids = self._node_ids.tolist()
+        node_received = self._node_received.tolist()
+        node_donated = self._node_donated.tolist()
+        edges = list(zip(self._edge_sources.tolist(), self._edge_targets.tolist()))
+        edge_received = self._edge_received.tolist()
+        edge_donated = self._edge_donated.tolist()
+
+        host_graph.add_nodes_from((node, {"label": self._labels[label], "electrons_donated": donated,
+                                          "electrons_received": received})
+                                  for node, label, donated, received in zip(node_ids, self._node_labels.tolist(),
+                                                                            node_donated, node_received))
+        host_graph.add_edges_from((node_ids[source], node_ids[target], {"label": self._labels[label],
+                                                                        "electrons_donated": donated,
+                                                                        "electrons_received": received})
+                                  for (source, target), label, donated, received in zip(edges,
+                                                                                        self._edge_labels.tolist(),
+                                                                                        edge_donated, edge_received))
+
+        marking: Dict[Union[int, Tuple[int, int]], Tuple[int, int]] =\
+            {node_ids[position]: (node_received[position], node_donated[position])
+             for position in np.flatnonzero(self._node_marked).tolist()}
+        marking.update({(node_ids[edges[index][0]], node_ids[edges[index][1]]): (edge_received[index],
+                                                                                 edge_donated[index])
+                        for index in np.flatnonzero(self._edge_marked).tolist()})
+
+        return OverlayGraph(host_graph, marking, self._digest)
+
+
+def compute_product_graphs(overlay_graphs: List[CompactOverlayGraph]) -> Tuple[List[Optional[nx.Graph]], np.ndarray]:
+    labels: Dict[str, int] = {}
+    label_maps = [np.array([labels.setdefault(label, len(labels)) for label in overlay_graph.labels], dtype=np.int64)
+                  for overlay_graph in overlay_graphs]
+
+    empty = [np.zeros(0, dtype=np.int64)]
+
+    node_labels, edge_valences, invalid = _product_arrays(
+        list(labels),
+        np.concatenate(empty + [label_map[og.node_labels] for label_map, og in zip(label_maps, overlay_graphs)]),
+        np.concatenate(empty + [og.node_balance for og in overlay_graphs]),
+        np.concatenate(empty + [label_map[og.edge_labels] for label_map, og in zip(label_maps, overlay_graphs)]),
+        np.concatenate(empty + [og.edge_balance for og in overlay_graphs]))
+
+    edge_counts = np.array([og.edge_count for og in overlay_graphs], dtype=np.int64)
+
+    invalid_graphs = np.zeros(len(overlay_graphs), dtype=bool)
+    invalid_graphs[np.repeat(np.arange(len(overlay_graphs)), edge_counts)[invalid]] = True
+
+    node_offsets = np.cumsum([0] + [og.node_count for og in overlay_graphs]).tolist()
+    edge_offsets = np.cumsum(np.concatenate(([0], edge_counts))).tolist()
+
+    product_graphs: List[Optional[nx.Graph]] = []
+    for index, overlay_graph in enumerate(overlay_graphs):
+        if invalid_graphs[index]:
+            product_graphs.append(None)
+            continue
+
+        product_graphs.append(overlay_graph.cache_product_graph(
+            node_labels[node_offsets[index]:node_offsets[index + 1]],
+            edge_valences[edge_offsets[index]:edge_offsets[index + 1]]))
+
+    return product_graphs, invalid_graphs
@@ -5,7 +5,8 @@ import re
 
 from collections import Counter
 from networkx.algorithms.isomorphism import GraphMatcher
-from overlay_graphs.networkx_converter import get_component_graphs, get_rule_component_graphs_with_nx
+from overlay_graphs.networkx_converter import get_component_graphs, rule_left_component_graphs,\
+    rule_right_component_graphs
 from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 
@@ -152,14 +153,14 @@ def _complete_match(match: 'Isomorphism', first_graphs: Dict[mod.Graph, nx.Graph
                         _compute_matches(still_unmatched_first, still_unmatched_second, reaction_center)]
 
 
-def _compute_sample_isomorphisms(first: mod.Rule.RightGraph, second: mod.Rule.LeftGraph, reaction_center: Set[int]) ->\
+def _compute_sample_isomorphisms(first: mod.Rule, second: mod.Rule, reaction_center: Set[int]) ->\
         Iterable['Isomorphism']:
-    first_graphs = get_rule_component_graphs_with_nx(first)
-    second_graphs = get_rule_component_graphs_with_nx(second)
+    first_graphs = rule_right_component_graphs(first)
+    second_graphs = rule_left_component_graphs(second)
 
     for globals_match in _compute_matches(first_graphs, second_graphs, reaction_center):
         for match in _complete_match(globals_match, first_graphs, second_graphs, reaction_center):
-            if not match.is_complete(vertex.id for vertex in first.vertices):
+            if not match.is_complete(vertex.id for vertex in first.right.vertices):
                 continue
 
             yield match
@@ -396,7 +397,7 @@ class IsomorphismCache:
             self._cache[first] = {}
 
         if second not in self._cache[first]:
-            self._cache[first][second] = IsomorphismCacheEntry(_compute_sample_isomorphisms(first.right, second.left,
+            self._cache[first][second] = IsomorphismCacheEntry(_compute_sample_isomorphisms(first, second,
                                                                                             set(reaction_center)),
                                                                None)
 
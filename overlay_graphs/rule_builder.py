@@ -1,7 +1,17 @@
 import mod
+import networkx as nx
+import re
 
 
-from typing import Dict, List, Set, Tuple, Union
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Set, Tuple, Union
+
+
+_gml_rule_id_pattern: re.Pattern = re.compile(r'^\s*ruleID\s+"([^"]*)"\s*$')
+_gml_section_pattern: re.Pattern = re.compile(r"^\s*(left|context|right)\s*\[\s*$")
+_gml_node_pattern: re.Pattern = re.compile(r'^\s*node\s*\[\s*id\s+(-?[0-9]+)\s+label\s+"([^"]*)"\s*\]\s*$')
+_gml_edge_pattern: re.Pattern = re.compile(r'^\s*edge\s*\[\s*source\s+(-?[0-9]+)\s+target\s+(-?[0-9]+)\s+'
+                                           r'label\s+"([^"]*)"\s*\]\s*$')
 
 
 class EdgeTuple(Tuple[int, int]):
@@ -14,26 +24,44 @@ class RuleGraph:
         self._name: str = name
 
         self._elements: Dict[Union[int, EdgeTuple], str] = {}
+        self._vertices: Dict[int, str] = {}
+        self._edges: Dict[EdgeTuple, str] = {}
+
+        self._max_vertex: int = -1
 
     @property
-    def vertices(self) -> Dict[int, str]:
-        return {element: label for element, label in self._elements.items() if isinstance(element, int)}
+    def vertices(self) -> Mapping[int, str]:
+        return MappingProxyType(self._vertices)
 
     @property
-    def edges(self) -> Dict[EdgeTuple, str]:
-        return {element: label for element, label in self._elements.items() if not isinstance(element, int)}
+    def edges(self) -> Mapping[EdgeTuple, str]:
+        return MappingProxyType(self._edges)
+
+    @property
+    def max_vertex(self) -> int:
+        return self._max_vertex
+
+    def _element_index(self, element: Union[int, EdgeTuple]) -> Dict[Union[int, EdgeTuple], str]:
+        return self._vertices if isinstance(element, int) else self._edges
 
     def has_element(self, element: Union[int, EdgeTuple]) -> bool:
-        return element in self._elements
+        return element in self._element_index(element)
 
     def label(self, element: Union[int, EdgeTuple]) -> str:
-        return self._elements[element]
+        return self._element_index(element)[element]
 
     def add_element(self, element: Union[int, EdgeTuple], label: str):
         self._elements[element] = label
 
+        if isinstance(element, int):
+            self._vertices[element] = label
+            self._max_vertex = max(self._max_vertex, element)
+        else:
+            self._edges[element] = label
+
     def remove_element(self, element: Union[int, EdgeTuple]):
         del self._elements[element]
+        del self._element_index(element)[element]
 
     def to_gml(self, indent: int = 1) -> str:
         indent_string = "\t" * indent
@@ -61,11 +89,40 @@ class RuleBuilder:
 
     @property
     def vertices(self) -> Set[int]:
-        return set(self._left.vertices.keys()).union(self._context.vertices.keys()).union(self._right.vertices.keys())
+        return set(self._left.vertices).union(self._context.vertices, self._right.vertices)
 
     @property
     def edges(self) -> Set[EdgeTuple]:
-        return set(self._left.edges.keys()).union(self._context.edges.keys()).union(self._right.edges.keys())
+        return set(self._left.edges).union(self._context.edges, self._right.edges)
+
+    @property
+    def max_vertex(self) -> int:
+        return max(self._left.max_vertex, self._context.max_vertex, self._right.max_vertex)
+
+    @property
+    def combined_graph(self) -> nx.Graph:
+        graph = nx.Graph()
+
+        graph.add_nodes_from((vertex, {"label": f"({self._side_label(vertex, self._left)}; "
+                                                f"{self._side_label(vertex, self._right)})"})
+                             for vertex in sorted(self.vertices))
+        graph.add_edges_from((edge[0], edge[1], {"label": f"({self._side_label(edge, self._left)}; "
+                                                          f"{self._side_label(edge, self._right)})"})
+                             for edge in sorted(self.edges))
+
+        return graph
+
+    @property
+    def left_graph(self) -> nx.Graph:
+        graph = nx.Graph()
+
+        for side in (self._left, self._context):
+            graph.add_nodes_from((vertex, {"label": label}) for vertex, label in side.vertices.items())
+
+        for side in (self._left, self._context):
+            graph.add_edges_from((edge[0], edge[1], {"label": label}) for edge, label in side.edges.items())
+
+        return graph
 
     @staticmethod
     def _add_edge_vertices(edge: EdgeTuple, target_graph: RuleGraph, alternative_graphs: List[RuleGraph]):
@@ -76,25 +133,71 @@ class RuleBuilder:
                 target_graph.add_element(vertex, "*")
 
     @staticmethod
-    def from_rule(rule: mod.Rule) -> 'RuleBuilder':
-        builder = RuleBuilder(rule.name)
+    def from_rule(rule: mod.Rule, rule_id: Optional[str] = None, vertex_map: Optional[Dict[int, int]] = None) ->\
+            'RuleBuilder':
+        builder = RuleBuilder(rule.name if rule_id is None else rule_id)
+
+        if vertex_map is None:
+            vertex_map = {vertex.id: vertex.id for vertex in rule.vertices}
 
         for vertex in rule.vertices:
             if not vertex.left.isNull():
-                builder.add_left_vertex(vertex.id, vertex.left.stringLabel)
+                builder.add_left_vertex(vertex_map[vertex.id], vertex.left.stringLabel)
 
             if not vertex.right.isNull():
-                builder.add_right_vertex(vertex.id, vertex.right.stringLabel)
+                builder.add_right_vertex(vertex_map[vertex.id], vertex.right.stringLabel)
 
         for edge in rule.edges:
+            source, target = vertex_map[edge.source.id], vertex_map[edge.target.id]
+
             if not edge.left.isNull():
-                builder.add_left_edge(edge.source.id, edge.target.id, edge.left.stringLabel)
+                builder.add_left_edge(source, target, edge.left.stringLabel)
 
             if not edge.right.isNull():
-                builder.add_right_edge(edge.source.id, edge.target.id, edge.right.stringLabel)
+                builder.add_right_edge(source, target, edge.right.stringLabel)
 
         return builder
 
+    @staticmethod
+    def from_gml(gml: str) -> 'RuleBuilder':
+        builder = RuleBuilder("")
+        sides = {"left": builder._left, "context": builder._context, "right": builder._right}
+
+        side: Optional[RuleGraph] = None
+        for line in gml.splitlines():
+            match = _gml_rule_id_pattern.match(line)
+            if match is not None:
+                builder._id = match.group(1)
+                continue
+
+            match = _gml_section_pattern.match(line)
+            if match is not None:
+                side = sides[match.group(1)]
+                continue
+
+            match = _gml_node_pattern.match(line)
+            if match is not None and side is not None:
+                side.add_element(int(match.group(1)), match.group(2))
+                continue
+
+            match = _gml_edge_pattern.match(line)
+            if match is not None and side is not None:
+                side.add_element(EdgeTuple((int(match.group(1)), int(match.group(2)))), match.group(3))
+                continue
+
+            if line.strip() == "]":
+                side = None
+            elif line.strip() not in ("", "rule ["):
+                raise ValueError(f"Unsupported line in rule GML: '{line.strip()}'")
+
+        return builder
+
+    def _side_label(self, element: Union[int, EdgeTuple], side: RuleGraph) -> str:
+        if self._context.has_element(element):
+            return self._context.label(element)
+
+        return side.label(element) if side.has_element(element) else ""
+
     def _add_side_element(self, element: Union[int, EdgeTuple], label: str, side: RuleGraph, opposite_side: RuleGraph):
         if self._context.has_element(element):
             context_label = self._context.label(element)
@@ -129,12 +232,12 @@ class RuleBuilder:
         self._add_edge_vertices(edge, side, [self._context])
 
     def has_vertex(self, id: int) -> bool:
-        return id in self.vertices
+        return self._left.has_element(id) or self._context.has_element(id) or self._right.has_element(id)
 
     def has_edge(self, source: int, target: int) -> bool:
         edge = EdgeTuple((source, target))
 
-        return edge in self.edges
+        return self._left.has_element(edge) or self._context.has_element(edge) or self._right.has_element(edge)
 
     def add_left_vertex(self, id: int, label: str):
         self._add_left_element(id, label)
@@ -167,7 +270,7 @@ class RuleBuilder:
         vertex_id_map = {}
 
         for vertex in graph.vertices:
-            vertex_id_map[vertex.id] = 1 + max(self.vertices) if len(self.vertices) > 0 else 0
+            vertex_id_map[vertex.id] = self.max_vertex + 1
             self.add_context_vertex(vertex_id_map[vertex.id], vertex.stringLabel)
 
         for edge in graph.edges:
@@ -0,0 +1,203 @@
+import mod
+import networkx as nx
+
+
+from collections import Counter, deque
+from overlay_graphs.label_parser import is_term
+from overlay_graphs.networkx_converter import graph_to_nx_graph
+from overlay_graphs.rule_builder import RuleBuilder
+from overlay_graphs.substrate_rule_bundle import SubstrateRule
+from overlay_graphs.util import parallel_map
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+
+Bond = Tuple[str, str, str]
+
+_worker_rules: Dict[str, mod.Rule] = {}
+
+
+def _is_wildcard(label: str) -> bool:
+    return label == "*" or is_term(label)
+
+
+def _bond(graph: nx.Graph, source: int, target: int, label: str) -> Optional[Bond]:
+    source_label, target_label = sorted((graph.nodes[source]["label"], graph.nodes[target]["label"]))
+
+    if _is_wildcard(label) or _is_wildcard(source_label) or _is_wildcard(target_label):
+        return None
+
+    return source_label, label, target_label
+
+
+class GraphProfile:
+    def __init__(self, graph: nx.Graph):
+        self._vertex_count: int = graph.number_of_nodes()
+        self._labels: Counter[str] = Counter(label for node, label in graph.nodes(data="label"))
+        self._edge_labels: Counter[str] = Counter(label for source, target, label in graph.edges(data="label"))
+        self._bonds: Counter[Bond] = Counter(_bond(graph, source, target, label)
+                                             for source, target, label in graph.edges(data="label"))
+        del self._bonds[None]
+
+    @property
+    def vertex_count(self) -> int:
+        return self._vertex_count
+
+    @property
+    def labels(self) -> Counter[str]:
+        return self._labels
+
+    @property
+    def edge_labels(self) -> Counter[str]:
+        return self._edge_labels
+
+    @property
+    def bonds(self) -> Counter[Bond]:
+        return self._bonds
+
+
+class ComponentRequirements:
+    def __init__(self, component: nx.Graph):
+        self._vertex_count: int = component.number_of_nodes()
+        self._labels: Counter[str] = Counter(label for node, label in component.nodes(data="label")
+                                             if not _is_wildcard(label))
+        self._edge_labels: Counter[str] = Counter(label for source, target, label in component.edges(data="label")
+                                                  if not _is_wildcard(label))
+        self._bonds: Counter[Bond] = Counter(_bond(component, source, target, label)
+                                             for source, target, label in component.edges(data="label"))
+        del self._bonds[None]
+
+    @property
+    def labels(self) -> Counter[str]:
+        return self._labels
+
+    def admits(self, profile: GraphProfile) -> bool:
+        return self._vertex_count <= profile.vertex_count and\
+            all(profile.labels[label] >= count for label, count in self._labels.items()) and\
+            all(profile.edge_labels[label] >= count for label, count in self._edge_labels.items()) and\
+            all(profile.bonds[bond] >= count for bond, count in self._bonds.items())
+
+
+def _apply_rule(arguments: Tuple[str, str, List[str], int]) -> Tuple[List[List[str]], Optional[str]]:
+    rule_gml, graph_gml, co_reactant_gmls, copies = arguments
+
+    try:
+        if rule_gml not in _worker_rules:
+            _worker_rules[rule_gml] = mod.ruleGMLString(rule_gml, add=False)
+
+        rule = _worker_rules[rule_gml]
+        graph = mod.graphGMLString(graph_gml, add=False)
+        co_reactants = [mod.graphGMLString(gml, add=False) for gml in co_reactant_gmls]
+
+        dg = mod.DG(graphDatabase=[graph] + co_reactants)
+        with dg.build() as builder:
+            derivations = builder.apply([graph] * copies + co_reactants * (copies - 1), rule, onlyProper=False)
+
+        return [[target.graph.smiles for target in derivation.targets] for derivation in derivations
+                if any(source.graph == graph for source in derivation.sources)], None
+    except (mod.InputError, mod.LogicError) as error:
+        return [], str(error)
+
+
+class SubstrateRuleIndex:
+    def __init__(self, rules: Iterable[SubstrateRule]):
+        self._rules: List[SubstrateRule] = list(rules)
+        self._components: List[List[ComponentRequirements]] = []
+
+        for rule in self._rules:
+            left_graph = RuleBuilder.from_gml(rule.gml).left_graph
+
+            self._components.append([ComponentRequirements(left_graph.subgraph(nodes))
+                                     for nodes in nx.connected_components(left_graph)])
+
+        label_frequencies = Counter(label for components in self._components for component in components
+                                    for label in component.labels)
+
+        self._buckets: Dict[Optional[str], List[Tuple[int, int]]] = {}
+        for rule_index, components in enumerate(self._components):
+            for component_index, component in enumerate(components):
+                key = min(component.labels, key=lambda label: (label_frequencies[label], label), default=None)
+                self._buckets.setdefault(key, []).append((rule_index, component_index))
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def rules(self) -> List[SubstrateRule]:
+        return list(self._rules)
+
+    @staticmethod
+    def _profile(graph: Union[mod.Graph, nx.Graph, GraphProfile]) -> GraphProfile:
+        if isinstance(graph, GraphProfile):
+            return graph
+
+        if isinstance(graph, nx.Graph):
+            return GraphProfile(graph)
+
+        return GraphProfile(graph_to_nx_graph(graph, use_indices=True))
+
+    def _admitted_components(self, profile: GraphProfile) -> Set[Tuple[int, int]]:
+        admitted = set()
+
+        for key in [None] + [label for label in profile.labels if label in self._buckets]:
+            for rule_index, component_index in self._buckets.get(key, []):
+                if self._components[rule_index][component_index].admits(profile):
+                    admitted.add((rule_index, component_index))
+
+        return admitted
+
+    def _candidate_indices(self, admitted: Set[Tuple[int, int]], required: Optional[Set[Tuple[int, int]]] = None) ->\
+            List[int]:
+        return [rule_index for rule_index, components in enumerate(self._components)
+                if len(components) > 0 and
+                all((rule_index, component_index) in admitted for component_index in range(len(components))) and
+                (required is None or
+                 any((rule_index, component_index) in required for component_index in range(len(components))))]
+
+    def candidates(self, graphs: Union[mod.Graph, nx.Graph, Iterable[Union[mod.Graph, nx.Graph]]]) ->\
+            List[SubstrateRule]:
+        if isinstance(graphs, (mod.Graph, nx.Graph)):
+            graphs = [graphs]
+
+        admitted = set().union(*(self._admitted_components(self._profile(graph)) for graph in graphs))
+
+        return [self._rules[index] for index in self._candidate_indices(admitted)]
+
+    def apply(self, graphs: Iterable[mod.Graph], co_reactants: Iterable[mod.Graph] = (), processes: int = 1,
+              errors: Optional[List[Tuple[mod.Graph, SubstrateRule, str]]] = None) ->\
+            Iterable[Tuple[mod.Graph, SubstrateRule, List[List[str]]]]:
+        tasks: Deque[Tuple[mod.Graph, int]] = deque()
+
+        co_reactants = list(co_reactants)
+        co_reactant_gmls = [graph.getGMLString() for graph in co_reactants]
+        co_reactant_admitted = [self._admitted_components(self._profile(graph)) for graph in co_reactants]
+        pool_admitted = set().union(*co_reactant_admitted)
+
+        def arguments() -> Iterable[Tuple[str, str, List[str], int]]:
+            for graph in graphs:
+                graph_gml = graph.getGMLString()
+                graph_admitted = self._admitted_components(self._profile(graph))
+
+                for index in self._candidate_indices(graph_admitted | pool_admitted, graph_admitted):
+                    component_count = len(self._components[index])
+                    rule_co_reactants = [gml for gml, admitted in zip(co_reactant_gmls, co_reactant_admitted)
+                                         if gml != graph_gml and component_count > 1 and
+                                         any((index, component) in admitted for component in range(component_count))]
+
+                    tasks.append((graph, index))
+                    yield self._rules[index].gml, graph_gml, rule_co_reactants, component_count
+
+        if processes > 1:
+            results = parallel_map(_apply_rule, arguments(), processes)
+        else:
+            results = (_apply_rule(argument) for argument in arguments())
+
+        for products, error in results:
+            graph, rule_index = tasks.popleft()
+
+            if error is not None:
+                if errors is not None:
+                    errors.append((graph, self._rules[rule_index], error))
+                continue
+
+            if len(products) > 0:
+                yield graph, self._rules[rule_index], products
@@ -1,13 +1,21 @@
 import mod
+import networkx as nx
+import time
 
 
-from collections import Counter
+from collections import Counter, deque
+from networkx.algorithms.isomorphism import GraphMatcher
 from overlay_graphs.canonicalisation import CanonicalGraph, CanonicalRule, GraphCanonicaliser
 from overlay_graphs.filtered_rule import FilteredRule
 from overlay_graphs.label_parser import abstract_vertex_term_details, is_term
 from overlay_graphs.mechanism import Mechanism, Step
+from overlay_graphs.networkx_converter import rule_combined_nx_graph
 from overlay_graphs.rule_builder import RuleBuilder
-from typing import Iterable, List, Optional, Set, Tuple
+from overlay_graphs.util import parallel_map
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+_worker_sanitiser: Optional['MechanismSanitiser'] = None
 
 
 def _report_difference(direction: str, difference: Counter[CanonicalGraph, int], index: int, verbosity: int):
@@ -20,22 +28,148 @@ def _report_difference(direction: str, difference: Counter[CanonicalGraph, int],
         print(f"{report}")
 
 
+def _external_vertex_ids(rule: mod.Rule) -> Dict[int, int]:
+    vertex_ids = {}
+
+    for external_id in range(rule.minExternalId, rule.maxExternalId + 1):
+        vertex = rule.getVertexFromExternalId(external_id)
+
+        if not vertex.isNull():
+            vertex_ids[vertex.id] = external_id
+
+    return vertex_ids
+
+
+def _initialise_worker(small_molecule_gmls: List[str], preserve_peptide_chain_positions: bool,
+                       ignore_dative_bonds: bool):
+    global _worker_sanitiser
+
+    _worker_sanitiser = MechanismSanitiser((mod.graphGMLString(gml, add=False) for gml in small_molecule_gmls),
+                                           preserve_peptide_chain_positions, ignore_dative_bonds)
+
+
+def _sanitise_serialised_mechanism(arguments: Tuple[Dict[str, Any], int]) ->\
+        Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    mechanism_json, verbosity = arguments
+
+    sanitised_mechanism, failure = _worker_sanitiser._sanitise_mechanism(Mechanism.deserialise(mechanism_json),
+                                                                         verbosity)
+
+    if sanitised_mechanism is None:
+        return None, failure
+
+    return sanitised_mechanism.serialise(), None
+
+
+class RejectedMechanism:
+    def __init__(self, mechanism: Mechanism, reason: str, step: int):
+        self._mechanism: Mechanism = mechanism
+        self._reason: str = reason
+        self._step: int = step
+
+    def __str__(self) -> str:
+        return f'{self.mechanism} [step {self.step}: {self.reason}]'
+
+    @property
+    def mechanism(self) -> Mechanism:
+        return self._mechanism
+
+    @property
+    def reason(self) -> str:
+        return self._reason
+
+    @property
+    def step(self) -> int:
+        return self._step
+
+
+class SanitisationResult:
+    def __init__(self):
+        self._accepted: List[Mechanism] = []
+        self._rejected: List[RejectedMechanism] = []
+
+        self._one_step_count: int = 0
+        self._step_count: int = 0
+
+        self._elapsed: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self._accepted) + len(self._rejected)
+
+    @property
+    def accepted(self) -> List[Mechanism]:
+        return list(self._accepted)
+
+    @property
+    def rejected(self) -> List[RejectedMechanism]:
+        return list(self._rejected)
+
+    @property
+    def one_step_count(self) -> int:
+        return self._one_step_count
+
+    @property
+    def step_count(self) -> int:
+        return self._step_count
+
+    def _get_elapsed(self) -> float:
+        return self._elapsed
+
+    def _set_elapsed(self, value: float):
+        self._elapsed = value
+
+    elapsed = property(fget=_get_elapsed, fset=_set_elapsed)
+
+    def add_accepted(self, mechanism: Mechanism):
+        self._accepted.append(mechanism)
+
+        self._step_count += len(mechanism)
+        if len(mechanism) == 1:
+            self._one_step_count += 1
+
+    def add_rejected(self, rejection: RejectedMechanism):
+        self._rejected.append(rejection)
+
+
 class ExtendableCanonicalRule(CanonicalRule):
-    def __init__(self, rule: mod.Rule, canonicaliser: GraphCanonicaliser):
+    def __init__(self, rule: mod.Rule, canonicaliser: GraphCanonicaliser, name: Optional[str] = None,
+                 vertex_map: Optional[Dict[int, int]] = None):
         super().__init__(rule, canonicaliser)
 
+        self._name: Optional[str] = name
+        self._vertex_map: Optional[Dict[int, int]] = vertex_map
+
         self._extra_context: List[CanonicalGraph] = []
 
+        self._left_counter: Optional[Counter[CanonicalGraph, int]] = None
+        self._right_counter: Optional[Counter[CanonicalGraph, int]] = None
+
     @property
     def left(self) -> Tuple[CanonicalGraph]:
-        return tuple(sorted(list(super().left) + self._extra_context, key=lambda g: g.canonical_smiles))
+        return tuple(sorted(self.left_counter.elements(), key=lambda g: g.canonical_smiles))
 
     @property
     def right(self) -> Tuple[CanonicalGraph]:
-        return tuple(sorted(list(super().right) + self._extra_context, key=lambda g: g.canonical_smiles))
+        return tuple(sorted(self.right_counter.elements(), key=lambda g: g.canonical_smiles))
+
+    @property
+    def left_counter(self) -> Counter[CanonicalGraph, int]:
+        if self._left_counter is None:
+            self._left_counter = Counter(super().left)
+            self._left_counter.update(self._extra_context)
+
+        return self._left_counter
+
+    @property
+    def right_counter(self) -> Counter[CanonicalGraph, int]:
+        if self._right_counter is None:
+            self._right_counter = Counter(super().right)
+            self._right_counter.update(self._extra_context)
+
+        return self._right_counter
 
     def _to_rule_builder(self) -> RuleBuilder:
-        rule_builder = RuleBuilder.from_rule(self.rule)
+        rule_builder = RuleBuilder.from_rule(self.rule, self._name, self._vertex_map)
 
         for graph in self._extra_context:
             rule_builder.add_context_graph(graph.graph)
@@ -43,14 +177,59 @@ class ExtendableCanonicalRule(CanonicalRule):
         return rule_builder
 
     def add_context(self, graphs: Iterable[CanonicalGraph]):
+        graphs = list(graphs)
+
         self._extra_context.extend(graphs)
 
+        if self._left_counter is not None:
+            self._left_counter.update(graphs)
+
+        if self._right_counter is not None:
+            self._right_counter.update(graphs)
+
     def to_gml(self) -> str:
         return self._to_rule_builder().to_gml()
 
     def to_mod_rule(self) -> mod.Rule:
         return self._to_rule_builder().to_mod_rule()
 
+    def derive(self, name: str, vertex_map: Dict[int, int]) -> 'ExtendableCanonicalRule':
+        rule = ExtendableCanonicalRule(self.rule, self._canonicaliser, name, vertex_map)
+        rule._adopt_canonical_forms(self)
+
+        return rule
+
+
+class SanitisedStep:
+    def __init__(self, rule_graph: nx.Graph, abstract_rule: ExtendableCanonicalRule,
+                 sanitised_rule: ExtendableCanonicalRule):
+        self._rule_graph: nx.Graph = rule_graph
+
+        self._abstract_rule: ExtendableCanonicalRule = abstract_rule
+        self._sanitised_rule: ExtendableCanonicalRule = sanitised_rule
+
+        self._abstract_vertex_map: Dict[int, int] = _external_vertex_ids(abstract_rule.rule)
+        self._sanitised_vertex_map: Dict[int, int] = _external_vertex_ids(sanitised_rule.rule)
+
+    def _isomorphism(self, rule_graph: nx.Graph) -> Dict[int, int]:
+        matcher = GraphMatcher(self._rule_graph, rule_graph, lambda node1, node2: node1["label"] == node2["label"],
+                               lambda edge1, edge2: edge1["label"] == edge2["label"])
+
+        return next(matcher.isomorphisms_iter())
+
+    def instantiate(self, rule: mod.Rule, rule_graph: Optional[nx.Graph] = None) ->\
+            Tuple[ExtendableCanonicalRule, ExtendableCanonicalRule]:
+        if rule_graph is None:
+            return self._abstract_rule.derive(rule.name, self._abstract_vertex_map),\
+                self._sanitised_rule.derive(rule.name, self._sanitised_vertex_map)
+
+        isomorphism = self._isomorphism(rule_graph)
+
+        return self._abstract_rule.derive(rule.name, {vertex: isomorphism[rule_vertex] for vertex, rule_vertex in
+                                                      self._abstract_vertex_map.items()}),\
+            self._sanitised_rule.derive(rule.name, {vertex: isomorphism[rule_vertex] for vertex, rule_vertex in
+                                                    self._sanitised_vertex_map.items()})
+
 
 class MechanismSanitiser:
     def __init__(self, small_molecules: Iterable[mod.Graph] = tuple(), preserve_peptide_chain_positions: bool = False,
@@ -64,6 +243,8 @@ class MechanismSanitiser:
         self._preserve_peptide_chain_positions: bool = preserve_peptide_chain_positions
         self._ignore_dative_bonds: bool = ignore_dative_bonds
 
+        self._step_cache: Dict[Tuple[Tuple[str], bool, bool], SanitisedStep] = {}
+
     def _get_preserve_peptide_chain_positions(self) -> bool:
         return self._preserve_peptide_chain_positions
 
@@ -99,20 +280,15 @@ class MechanismSanitiser:
 
         return False
 
-    @staticmethod
-    def _graph_tuple_difference(first_tuple: Tuple[CanonicalGraph], second_tuple: Tuple[CanonicalGraph]) ->\
-            Counter[CanonicalGraph, int]:
-        return Counter(first_tuple) - Counter(second_tuple)
-
     @staticmethod
     def _rule_difference(first_rule: ExtendableCanonicalRule, second_rule: ExtendableCanonicalRule) ->\
             Counter[CanonicalGraph, int]:
-        return MechanismSanitiser._graph_tuple_difference(first_rule.right, second_rule.left)
+        return first_rule.right_counter - second_rule.left_counter
 
     @staticmethod
     def _rule_codifference(first_rule: ExtendableCanonicalRule, second_rule: ExtendableCanonicalRule) ->\
             Counter[CanonicalGraph, int]:
-        return MechanismSanitiser._graph_tuple_difference(second_rule.left, first_rule.right)
+        return second_rule.left_counter - first_rule.right_counter
 
     def _sanitise_step(self, step: Step) -> (mod.Rule, mod.Rule):
         sanitised_rule = FilteredRule(step.rule)
@@ -140,6 +316,25 @@ class MechanismSanitiser:
 
         return abstract_rule.to_mod_rule(), sanitised_rule.to_mod_rule()
 
+    def _canonicalise_step(self, step: Step, verbosity: int) ->\
+            Tuple[ExtendableCanonicalRule, ExtendableCanonicalRule]:
+        rule_graph = rule_combined_nx_graph(step.rule)
+        key = (self._canonicaliser.nx_graph_canonical_smiles(rule_graph), self.preserve_peptide_chain_positions,
+               self.ignore_dative_bonds)
+
+        if key in self._step_cache:
+            if verbosity >= 2:
+                print(f"reusing sanitised rule for {step.rule}")
+
+            return self._step_cache[key].instantiate(step.rule, rule_graph)
+
+        abstract_rule, sanitised_rule = self._sanitise_step(step)
+
+        self._step_cache[key] = SanitisedStep(rule_graph, ExtendableCanonicalRule(abstract_rule, self._canonicaliser),
+                                              ExtendableCanonicalRule(sanitised_rule, self._canonicaliser))
+
+        return self._step_cache[key].instantiate(step.rule)
+
     def _canonicalise_steps(self, steps: List[Step], verbosity: int) ->\
             Iterable[Tuple[ExtendableCanonicalRule, ExtendableCanonicalRule]]:
         for step in steps:
@@ -149,11 +344,10 @@ class MechanismSanitiser:
             if verbosity >= 2:
                 print(f"sanitizing rule {step.rule}")
 
-            abstract_rule, sanitised_rule = self._sanitise_step(step)
-            yield ExtendableCanonicalRule(abstract_rule, self._canonicaliser),\
-                  ExtendableCanonicalRule(sanitised_rule, self._canonicaliser)
+            yield self._canonicalise_step(step, verbosity)
 
-    def _sanitise_steps(self, steps: List[Step], verbosity: int) -> Optional[List[ExtendableCanonicalRule]]:
+    def _sanitise_steps(self, steps: List[Step], verbosity: int) ->\
+            Tuple[Optional[List[ExtendableCanonicalRule]], Optional[Tuple[str, int]]]:
         canonical_rules = list(self._canonicalise_steps(steps, verbosity))
 
         for index in range(1, len(canonical_rules)):
@@ -169,7 +363,7 @@ class MechanismSanitiser:
                         not set(codifference).issubset(self._small_molecules):
                     if verbosity >= 2:
                         print(f"Failed to sanitise step {index}")
-                    return None
+                    return None, ("unbalanced molecules with the previous step", steps[index].number)
 
                 _report_difference("forward", difference, index, verbosity)
 
@@ -188,10 +382,10 @@ class MechanismSanitiser:
             second_rule.add_context(difference.elements())
 
         if verbosity >= 2:
-            print(str(sum(graph.graph.numVertices for graph in canonical_rules[0][1].left) if
+            print(str(sum(graph.graph.numVertices for graph in canonical_rules[0][1].left_counter.elements()) if
                       len(canonical_rules) > 0 else 0))
 
-        return [sanitised_rule for abstract_rule, sanitised_rule in canonical_rules]
+        return [sanitised_rule for abstract_rule, sanitised_rule in canonical_rules], None
 
     def add_small_molecule(self, molecule: mod.Graph):
         self._small_molecules.add(self._canonicaliser.canonicalise_graph(molecule))
@@ -200,19 +394,64 @@ class MechanismSanitiser:
         for molecule in molecules:
             self.add_small_molecule(molecule)
 
-    def sanitise_mechanism(self, mechanism: Mechanism, verbosity: int = 0) -> Optional[Mechanism]:
-        canonical_steps = self._sanitise_steps(mechanism.steps, verbosity)
+    def _sanitise_mechanism(self, mechanism: Mechanism, verbosity: int) ->\
+            Tuple[Optional[Mechanism], Optional[Tuple[str, int]]]:
+        canonical_steps, failure = self._sanitise_steps(mechanism.steps, verbosity)
 
         if canonical_steps is None:
-            return None
+            return None, failure
 
         return Mechanism(mechanism.entry, mechanism.number,
                          [Step(mechanism.entry, mechanism.number, index + 1, canonical_step.to_mod_rule())
-                          for index, canonical_step in enumerate(canonical_steps)])
+                          for index, canonical_step in enumerate(canonical_steps)]), None
+
+    def _sanitise_in_parallel(self, mechanisms: Iterable[Mechanism], processes: int, verbosity: int) ->\
+            Iterable[Tuple[Mechanism, Optional[Mechanism], Optional[Tuple[str, int]]]]:
+        initargs = ([molecule.graph.getGMLString() for molecule in self._small_molecules],
+                    self.preserve_peptide_chain_positions, self.ignore_dative_bonds)
+
+        submitted = deque()
+
+        def serialised_mechanisms() -> Iterable[Tuple[Dict[str, Any], int]]:
+            for mechanism in mechanisms:
+                submitted.append(mechanism)
+                yield mechanism.serialise(), verbosity
+
+        for mechanism_json, failure in parallel_map(_sanitise_serialised_mechanism, serialised_mechanisms(),
+                                                    processes, _initialise_worker, initargs):
+            mechanism = submitted.popleft()
+
+            yield mechanism, Mechanism.deserialise(mechanism_json) if mechanism_json is not None else None, failure
+
+    def _sanitise_all(self, mechanisms: Iterable[Mechanism], verbosity: int, processes: int) ->\
+            Iterable[Tuple[Mechanism, Optional[Mechanism], Optional[Tuple[str, int]]]]:
+        if processes > 1:
+            yield from self._sanitise_in_parallel(mechanisms, processes, verbosity)
+            return
 
-    def sanitise_mechanisms(self, mechanisms: Iterable[Mechanism], verbosity: int = 0) -> Iterable[Mechanism]:
         for mechanism in mechanisms:
-            sanitised_mechanism = self.sanitise_mechanism(mechanism, verbosity)
+            yield (mechanism, *self._sanitise_mechanism(mechanism, verbosity))
+
+    def sanitise_mechanism(self, mechanism: Mechanism, verbosity: int = 0) -> Optional[Mechanism]:
+        return self._sanitise_mechanism(mechanism, verbosity)[0]
 
+    def sanitise_mechanisms(self, mechanisms: Iterable[Mechanism], verbosity: int = 0, processes: int = 1) ->\
+            Iterable[Mechanism]:
+        for mechanism, sanitised_mechanism, failure in self._sanitise_all(mechanisms, verbosity, processes):
             if sanitised_mechanism is not None:
                 yield sanitised_mechanism
+
+    def sanitise(self, mechanisms: Iterable[Mechanism], verbosity: int = 0, processes: int = 1) ->\
+            SanitisationResult:
+        result = SanitisationResult()
+        start = time.perf_counter()
+
+        for mechanism, sanitised_mechanism, failure in self._sanitise_all(mechanisms, verbosity, processes):
+            if sanitised_mechanism is not None:
+                result.add_accepted(sanitised_mechanism)
+            else:
+                result.add_rejected(RejectedMechanism(mechanism, *failure))
+
+        result.elapsed = time.perf_counter() - start
+
+        return result
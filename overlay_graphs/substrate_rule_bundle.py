@@ -0,0 +1,186 @@
+import json
+import mod
+
+
+from overlay_graphs.substrate_rules import load_substrate_rules
+from overlay_graphs.util import parallel_map
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+
+_bundle_version = 1
+
+RejectedErrors = Tuple[Type[Exception], ...]
+
+default_rejected_errors: RejectedErrors = (mod.InputError, mod.LogicError)
+
+_worker_rejected_errors: RejectedErrors = default_rejected_errors
+
+
+def _substrate_rule_error(rule: mod.Rule) -> Optional[str]:
+    left_charge = 0
+    right_charge = 0
+
+    for vertex in rule.vertices:
+        if vertex.left.isNull() or vertex.right.isNull():
+            return f"Vertex {vertex.id} is {'created' if vertex.left.isNull() else 'deleted'} by the rule"
+
+        if int(vertex.left.atomId) != int(vertex.right.atomId):
+            return f"Vertex {vertex.id} changes its atom type from '{vertex.left.stringLabel}' to " \
+                   f"'{vertex.right.stringLabel}'"
+
+        left_charge += int(vertex.left.charge)
+        right_charge += int(vertex.right.charge)
+
+    if left_charge != right_charge:
+        return f"Charge is not conserved ({left_charge} on the left, {right_charge} on the right)"
+
+    return None
+
+
+def _validate_substrate_rule(gml: str, rejected_errors: RejectedErrors = default_rejected_errors) -> Optional[str]:
+    try:
+        return _substrate_rule_error(mod.ruleGMLString(gml, add=False))
+    except rejected_errors as error:
+        return str(error)
+
+
+def _initialise_worker(rejected_errors: RejectedErrors):
+    global _worker_rejected_errors
+
+    _worker_rejected_errors = rejected_errors
+
+
+def _validate_substrate_rule_in_worker(gml: str) -> Optional[str]:
+    return _validate_substrate_rule(gml, _worker_rejected_errors)
+
+
+class SubstrateRuleError:
+    def __init__(self, name: str, sources: List[str], message: str):
+        self._name: str = name
+        self._sources: List[str] = sources
+        self._message: str = message
+
+    def __str__(self) -> str:
+        return f"Substrate rule {self.name} (from {', '.join(self.sources)}): {self.message}"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def sources(self) -> List[str]:
+        return self._sources
+
+    @property
+    def message(self) -> str:
+        return self._message
+
+
+class SubstrateRule:
+    def __init__(self, name: str, gml: str, sources: Optional[List[str]] = None,
+                 left_catalysts: Optional[List[Dict[str, str]]] = None,
+                 right_catalysts: Optional[List[Dict[str, str]]] = None):
+        self._name: str = name
+        self._gml: str = gml
+        self._sources: List[str] = [name] if sources is None else sources
+        self._left_catalysts: List[Dict[str, str]] = [] if left_catalysts is None else left_catalysts
+        self._right_catalysts: List[Dict[str, str]] = [] if right_catalysts is None else right_catalysts
+
+        self._rule: Optional[mod.Rule] = None
+
+    def __str__(self) -> str:
+        return self._name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def gml(self) -> str:
+        return self._gml
+
+    @property
+    def sources(self) -> List[str]:
+        return self._sources
+
+    @property
+    def left_catalysts(self) -> List[Dict[str, str]]:
+        return self._left_catalysts
+
+    @property
+    def right_catalysts(self) -> List[Dict[str, str]]:
+        return self._right_catalysts
+
+    @property
+    def rule(self) -> mod.Rule:
+        if self._rule is None:
+            self._rule = mod.ruleGMLString(self._gml, add=False)
+
+        return self._rule
+
+    @staticmethod
+    def deserialise(rule_json: Dict[str, Any]) -> 'SubstrateRule':
+        return SubstrateRule(rule_json["name"], rule_json["gml"], rule_json.get("sources"),
+                             rule_json.get("left_catalysts"), rule_json.get("right_catalysts"))
+
+    def serialise(self) -> Dict[str, Any]:
+        return {
+            "name": self._name,
+            "gml": self._gml,
+            "sources": self._sources,
+            "left_catalysts": self._left_catalysts,
+            "right_catalysts": self._right_catalysts
+        }
+
+
+def validate_substrate_rules(rules: Iterable[SubstrateRule], processes: int = 1,
+                             rejected_errors: RejectedErrors = default_rejected_errors) ->\
+        Iterable[Tuple[SubstrateRule, Optional[SubstrateRuleError]]]:
+    rules = list(rules)
+
+    if processes > 1:
+        errors = parallel_map(_validate_substrate_rule_in_worker, (rule.gml for rule in rules), processes,
+                              _initialise_worker, (rejected_errors,))
+    else:
+        errors = (_validate_substrate_rule(rule.gml, rejected_errors) for rule in rules)
+
+    for rule, error in zip(rules, errors):
+        yield rule, SubstrateRuleError(rule.name, rule.sources, error) if error is not None else None
+
+
+def write_substrate_rule_bundle(rule_file: str = "substrate_rules.jsonl",
+                                bundle_file: str = "substrate_rules.bundle.json", processes: int = 1,
+                                rejected_errors: RejectedErrors = default_rejected_errors,
+                                verbosity: int = 0) -> List[SubstrateRuleError]:
+    rules = (SubstrateRule.deserialise(rule_json) for rule_json in load_substrate_rules(rule_file))
+
+    valid_rules: List[SubstrateRule] = []
+    errors: List[SubstrateRuleError] = []
+
+    for rule, error in validate_substrate_rules(rules, processes, rejected_errors):
+        if error is None:
+            valid_rules.append(rule)
+            continue
+
+        errors.append(error)
+        if verbosity >= 1:
+            print(error)
+
+    with open(bundle_file, "w") as file:
+        json.dump({"version": _bundle_version, "source": rule_file,
+                   "rules": [rule.serialise() for rule in valid_rules]}, file)
+
+    if verbosity >= 1:
+        print(f"Bundled {len(valid_rules)} valid substrate rules, rejected {len(errors)}.")
+
+    return errors
+
+
+def load_substrate_rule_bundle(bundle_file: str = "substrate_rules.bundle.json") -> List[SubstrateRule]:
+    with open(bundle_file, "r") as file:
+        bundle_json = json.load(file)
+
+    if bundle_json.get("version") != _bundle_version:
+        raise ValueError(f"'{bundle_file}' is not a substrate rule bundle of version {_bundle_version}")
+
+    return [SubstrateRule.deserialise(rule_json) for rule_json in bundle_json["rules"]]
@@ -4,15 +4,22 @@ import networkx as nx
 import re
 
 
-from overlay_graphs.networkx_converter import get_component_graphs, nx_graph_to_gml
+from overlay_graphs.canonicalisation import canonical_graph_digest
+from overlay_graphs.catalysis import EnzymeComponentMatcher
+from overlay_graphs.networkx_converter import nx_graph_to_gml, nx_graph_to_mod_graph
 from overlay_graphs.rule_builder import EdgeTuple, RuleBuilder
 from overlay_graphs.overlay_graph import OverlayGraph
-from overlay_graphs.mcsadb import MCSAEntry
-from typing import Dict, Iterable, Tuple
+from overlay_graphs.mcsadb import MCSAEntries, MCSAEntry
+from overlay_graphs.util import parallel_map
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple, Union
 
 
 _non_and_dative = re.compile(r"^[?>]$")
 
+_worker_matcher: Optional[EnzymeComponentMatcher] = None
+_worker_disable_catalytic: bool = False
+_worker_deduplicate: bool = False
+
 
 def _filter_graph_edges(graph: nx.Graph, label_patter: re.Pattern) -> nx.Graph:
     return nx.subgraph_view(graph, filter_edge=lambda source, target: re.
@@ -29,44 +36,18 @@ def _remove_ghost_edges(graph: nx.Graph) -> nx.Graph:
     return new_graph
 
 
-def _make_substrate_rule(overlay_graph: OverlayGraph, rule_id: str, label_settings: mod.LabelSettings, disable_catalytic: bool) ->\
-        Tuple[str, Dict[mod.Graph, nx.Graph], Dict[mod.Graph, nx.Graph]]:
+def _make_substrate_rule(overlay_graph: OverlayGraph, rule_id: str, matcher: EnzymeComponentMatcher,
+                         disable_catalytic: bool) -> Tuple[str, Dict[mod.Graph, nx.Graph], Dict[mod.Graph, nx.Graph]]:
     left = _filter_graph_edges(overlay_graph.host_graph, _non_and_dative)
     right = _filter_graph_edges(overlay_graph.product_graph, _non_and_dative)
 
-    left_graphs = get_component_graphs(left)
-    right_graphs = get_component_graphs(right)
-
-    left_enzyme_components = []
-    right_enzyme_components = []
-    for left_graph, left_nx in left_graphs.items():
-        isomorphic_right_graphs = {graph: [node for node in left_nx.nodes if node in right_graphs[graph].nodes]
-                                   for graph in right_graphs
-                                   if graph.isomorphism(left_graph, labelSettings=label_settings) != 0 and
-                                   graph not in right_enzyme_components}
-
-        for graph in list(isomorphic_right_graphs):
-            if len(isomorphic_right_graphs[graph]) == 0:
-                del isomorphic_right_graphs[graph]
-
-        if len(isomorphic_right_graphs) == 0:
-            continue
-
-        for right_graph in sorted(isomorphic_right_graphs, key=lambda g: len(isomorphic_right_graphs[g]),
-                                  reverse=True):
-            if len(isomorphic_right_graphs[right_graph]) > left_graph.numVertices / 2 or \
-                    any(left_nx.nodes[node]["label"] != "H" for node in isomorphic_right_graphs[right_graph]):
-                left_enzyme_components.append(left_graph)
-                right_enzyme_components.append(right_graph)
-                break
+    enzyme_components = matcher.match(left, right)
 
     left_enzyme_vertices = set()
-    for component in left_enzyme_components:
-        left_enzyme_vertices.update(node for node in left_graphs[component].nodes)
-
     right_enzyme_vertices = set()
-    for component in right_enzyme_components:
-        right_enzyme_vertices.update(node for node in right_graphs[component].nodes)
+    for left_component, right_component in enzyme_components:
+        left_enzyme_vertices.update(left_component.nodes)
+        right_enzyme_vertices.update(right_component.nodes)
 
     rule_builder = RuleBuilder(rule_id)
 
@@ -86,7 +67,7 @@ def _make_substrate_rule(overlay_graph: OverlayGraph, rule_id: str, label_settin
             continue
 
         for index in edge_tuple:
-            if index not in rule_builder.vertices:
+            if not rule_builder.has_vertex(index):
                 if disable_catalytic or index not in left_enzyme_vertices:
                     rule_builder.add_left_vertex(index, left.nodes[index]["label"])
                 if disable_catalytic or index not in right_enzyme_vertices:
@@ -112,42 +93,190 @@ def _make_substrate_rule(overlay_graph: OverlayGraph, rule_id: str, label_settin
 
             continue
 
-    return (rule_builder.to_gml(), {comp: left_graphs[comp] for comp in left_enzyme_components},
-            {comp: right_graphs[comp] for comp in right_enzyme_components})
+    return (rule_builder.to_gml(), {nx_graph_to_mod_graph(left_component): left_component
+                                    for left_component, right_component in enzyme_components},
+            {nx_graph_to_mod_graph(right_component): right_component
+             for left_component, right_component in enzyme_components})
 
 
-def _make_substrate_rules(entry: MCSAEntry, rule_id: str, label_settings: mod.LabelSettings, disable_catalytic: bool) ->\
+def _make_substrate_rules(entry: MCSAEntry, rule_id: str, matcher: EnzymeComponentMatcher, disable_catalytic: bool) ->\
         Iterable[Tuple[str, Dict[mod.Graph, nx.Graph], Dict[mod.Graph, nx.Graph]]]:
     for index, overlay_graph in enumerate(entry.overlay_graphs):
-        yield _make_substrate_rule(overlay_graph, f"{rule_id}_{index}", label_settings, disable_catalytic)
+        yield _make_substrate_rule(overlay_graph, f"{rule_id}_{index}", matcher, disable_catalytic)
 
 
-def substrate_rules_for_entries(entries: Iterable[MCSAEntry]):
-    label_settings = mod.LabelSettings(mod.LabelType.String, mod.LabelRelation.Isomorphism)
+def _substrate_rule_key(gml: str) -> Optional[str]:
+    try:
+        return canonical_graph_digest(RuleBuilder.from_gml(gml).combined_graph)
+    except (mod.InputError, mod.LogicError, ValueError):
+        return None
 
-    rules = {}
-    disable_catalytic = False
+
+def _substrate_rule_records(entry: MCSAEntry, matcher: EnzymeComponentMatcher, disable_catalytic: bool,
+                            deduplicate: bool) -> List[Tuple[Optional[str], Dict[str, Any]]]:
+    rule_id = f"OG_{entry.entry}_{entry.mechanism}"
+
+    return [(_substrate_rule_key(gml) if deduplicate else None,
+             {"name": f"{rule_id}_{index}", "gml": gml,
+              "left_catalysts": [{"name": catalyst.name, "gml": nx_graph_to_gml(nx)}
+                                 for catalyst, nx in left_catalysts.items()],
+              "right_catalysts": [{"name": catalyst.name, "gml": nx_graph_to_gml(nx)}
+                                  for catalyst, nx in right_catalysts.items()]})
+            for index, (gml, left_catalysts, right_catalysts)
+            in enumerate(_make_substrate_rules(entry, rule_id, matcher, disable_catalytic))]
+
+
+def _initialise_worker(disable_catalytic: bool, deduplicate: bool):
+    global _worker_matcher, _worker_disable_catalytic, _worker_deduplicate
+
+    _worker_matcher = EnzymeComponentMatcher()
+    _worker_disable_catalytic = disable_catalytic
+    _worker_deduplicate = deduplicate
+
+
+def _serialised_entry_substrate_rules(entry_data: Union[bytes, str]) -> List[Tuple[Optional[str], Dict[str, Any]]]:
+    return _substrate_rule_records(MCSAEntry.deserialize(json.loads(entry_data)), _worker_matcher,
+                                   _worker_disable_catalytic, _worker_deduplicate)
+
+
+def _substrate_rules(entries: Iterable[MCSAEntry], disable_catalytic: bool, deduplicate: bool, processes: int) ->\
+        Iterable[List[Tuple[Optional[str], Dict[str, Any]]]]:
+    if processes > 1:
+        if isinstance(entries, MCSAEntries):
+            entry_data = entries.raw()
+        else:
+            entry_data = (json.dumps(entry.serialise()) for entry in entries)
+
+        yield from parallel_map(_serialised_entry_substrate_rules, entry_data, processes, _initialise_worker,
+                                (disable_catalytic, deduplicate))
+        return
+
+    matcher = EnzymeComponentMatcher()
 
     for entry in entries:
-        rule_id = f"OG_{entry.entry}_{entry.mechanism}"
+        yield _substrate_rule_records(entry, matcher, disable_catalytic, deduplicate)
+
+
+class _SubstrateRuleWriter:
+    def __init__(self, output_file: str):
+        self._file: TextIO = open(output_file, "w")
+        self._lines: bool = output_file.endswith(".jsonl")
+        self._count: int = 0
+
+        if not self._lines:
+            self._file.write("{\"rules\": [\n")
+
+    def __enter__(self) -> '_SubstrateRuleWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def count(self) -> int:
+        return self._count
 
-        for index, substrate_rule_tuple in enumerate(_make_substrate_rules(entry, rule_id, label_settings, disable_catalytic)):
-            rules[f"{rule_id}_{index}"] = substrate_rule_tuple
+    def write(self, record: Dict[str, Any]):
+        if self._lines:
+            self._file.write(f"{json.dumps(record)}\n")
+        else:
+            self._file.write(f"{',' if self._count > 0 else ''}\n{json.dumps(record)}")
 
-    with open("substrate_rules.json", "w") as file:
-        json.dump({
-            "rules": [{"name": rule_id, "gml": gml,
-                       "left_catalysts": [{"name": catalyst.name, "gml": nx_graph_to_gml(nx)}
-                                          for catalyst, nx in left_catalysts.items()],
-                       "right_catalysts": [{"name": catalyst.name, "gml": nx_graph_to_gml(nx)}
-                                           for catalyst, nx in right_catalysts.items()]}
-                      for rule_id, (gml, left_catalysts, right_catalysts) in rules.items()]
-        }, file, indent=2)
+        self._file.flush()
+        self._count += 1
 
+    def close(self):
+        if self._file.closed:
+            return
+
+        if not self._lines:
+            self._file.write("\n]}\n")
+
+        self._file.close()
+
+
+class _SubstrateRuleDeduplicator:
+    def __init__(self, verbosity: int = 0):
+        self._rules: Dict[str, str] = {}
+        self._verbosity: int = verbosity
+
+    def deduplicate(self, records: List[Tuple[Optional[str], Dict[str, Any]]]) -> Iterable[Dict[str, Any]]:
+        new_records: Dict[str, Dict[str, Any]] = {}
+        extensions: Dict[str, List[str]] = {}
+
+        for key, record in records:
+            if key is None:
+                if self._verbosity >= 1:
+                    print(f"Could not canonicalise substrate rule '{record['name']}', writing it undeduplicated.")
+
+                new_records[record["name"]] = {**record, "sources": [record["name"]]}
+            elif key not in self._rules:
+                self._rules[key] = record["name"]
+                new_records[record["name"]] = {**record, "sources": [record["name"]]}
+            elif self._rules[key] in new_records:
+                new_records[self._rules[key]]["sources"].append(record["name"])
+            else:
+                extensions.setdefault(self._rules[key], []).append(record["name"])
+
+        yield from new_records.values()
+
+        for name, sources in extensions.items():
+            yield {"extends": name, "sources": sources}
+
+
+def _read_substrate_rule_records(rule_file: str) -> Iterable[Dict[str, Any]]:
+    with open(rule_file, "r") as file:
+        if rule_file.endswith(".jsonl"):
+            for line in file:
+                if line.strip() != "":
+                    yield json.loads(line)
+        else:
+            yield from json.load(file)["rules"]
+
+
+def load_substrate_rules(rule_file: str = "substrate_rules.jsonl") -> List[Dict[str, Any]]:
+    rules: Dict[str, Dict[str, Any]] = {}
+
+    for record in _read_substrate_rule_records(rule_file):
+        if "extends" in record:
+            rules[record["extends"]]["sources"].extend(record["sources"])
+        else:
+            rules[record["name"]] = record
+
+    return list(rules.values())
+
+
+def print_substrate_rules(rules: Iterable[Dict[str, Any]]):
     printer = mod.GraphPrinter()
     mod.config.stereo.silenceDeductionWarnings = True
-    for rule_id, (gml, left, right) in rules.items():
-        mod.postSection(rule_id)
-        mod.ruleGMLString(gml).print(printer)
 
+    for rule in rules:
+        mod.postSection(rule["name"])
+        mod.ruleGMLString(rule["gml"], add=False).print(printer)
+
+
+def substrate_rules_for_entries(entries: Iterable[MCSAEntry], output_file: str = "substrate_rules.jsonl",
+                                processes: int = 1, deduplicate: bool = True, print_rules: bool = True,
+                                verbosity: int = 0):
+    disable_catalytic = False
+
+    deduplicator = _SubstrateRuleDeduplicator(verbosity) if deduplicate else None
+    rule_count = 0
+
+    with _SubstrateRuleWriter(output_file) as writer:
+        for keyed_records in _substrate_rules(entries, disable_catalytic, deduplicate, processes):
+            rule_count += len(keyed_records)
+
+            if deduplicator is not None:
+                records = deduplicator.deduplicate(keyed_records)
+            else:
+                records = (record for key, record in keyed_records)
+
+            for record in records:
+                writer.write(record)
+
+    if verbosity >= 1:
+        print(f"Wrote {writer.count} records for {rule_count} substrate rules to '{output_file}'.")
 
+    if print_rules:
+        print_substrate_rules(load_substrate_rules(output_file))
@@ -1,32 +1,208 @@
+import codecs
 import json
+import mod
+import re
 import subprocess as sp
 
 
-from overlay_graphs.mechanism import Mechanism, Step
-from typing import Dict, Iterable, List, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from overlay_graphs.mechanism import Mechanism, RuleLoadError, Step
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+
+_json_decoder: json.JSONDecoder = json.JSONDecoder()
+_json_whitespace: re.Pattern = re.compile(r"[ \t\n\r]*")
+_json_truncation_margin = 16
 
 
 def convert_svg(_svg: str, _pdf: str):
     sp.run(['rsvg-convert', '-f', 'pdf', '-o', _pdf, _svg])
 
 
-def load_mechanisms(mechanism_file: str = "mechanisms.json") -> Iterable[Mechanism]:
-    with open(mechanism_file, "r") as file:
-        mechanisms_json = json.load(file)
+def _utf8_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def iterate_json_array(file: BinaryIO, chunk_size: int = 1 << 20) -> Iterable[Tuple[int, int, Any]]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    buffer = ""
+    position = 0
+    offset = 0
+    exhausted = False
+
+    opened = False
+    expect_value = True
+    first = True
+
+    while True:
+        skipped = _json_whitespace.match(buffer, position).end()
+        offset += skipped - position
+        position = skipped
+
+        if position < len(buffer):
+            character = buffer[position]
+
+            if not opened:
+                if character != "[":
+                    raise ValueError(f"Expected a JSON array at byte {offset}")
+
+                opened = True
+                offset += 1
+                position += 1
+                continue
+
+            if character == "]" and (not expect_value or first):
+                return
+
+            if not expect_value:
+                if character != ",":
+                    raise ValueError(f"Expected ',' or ']' at byte {offset}")
+
+                expect_value = True
+                offset += 1
+                position += 1
+                continue
+
+            if character in ",]":
+                raise ValueError(f"Expected a JSON value at byte {offset}")
+
+            try:
+                value, end = _json_decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                end = None
+
+                # Apart from unterminated strings, a cut-off element fails within a few characters of the buffer end.
+                if exhausted or (len(buffer) - error.pos > _json_truncation_margin and
+                                 not error.msg.startswith("Unterminated string")):
+                    raise ValueError(f"Invalid JSON array element at byte "
+                                     f"{offset + _utf8_length(buffer[position:error.pos])}: {error.msg}") from error
+
+            # A number ending near the buffer end may continue in the next chunk.
+            if end is not None and (len(buffer) - end > _json_truncation_margin or exhausted):
+                length = _utf8_length(buffer[position:end])
+
+                yield offset, offset + length, value
+
+                offset += length
+                position = end
+
+                expect_value = False
+                first = False
+                continue
+        elif exhausted:
+            raise ValueError(f"Unexpected end of JSON array at byte {offset}")
+
+        chunk = file.read(chunk_size)
+        exhausted = len(chunk) == 0
+
+        buffer = buffer[position:] + decoder.decode(chunk, final=exhausted)
+        position = 0
+
+
+def _check_rule_gml(gml: Optional[str]) -> Optional[str]:
+    if gml is None:
+        return None
+
+    try:
+        mod.ruleGMLString(gml, add=False)
+    except mod.InputError as error:
+        return str(error)
+
+    return None
+
+
+def _load_steps(mechanism_file: str, verbosity: int) -> Iterable[Tuple[Tuple[int, int], Step]]:
+    with open(mechanism_file, "rb") as file:
+        for start, end, step_json in iterate_json_array(file):
+            step_json["gml"] = step_json["gml"].replace(">", ":")
+
+            yield (step_json["entry"], step_json["proposal"]), Step.deserialise(step_json, verbosity=verbosity)
+
+
+def _check_steps(steps: Iterable[Tuple[Tuple[int, int], Step]], processes: int) ->\
+        Iterable[Tuple[Tuple[int, int], Step]]:
+    submitted = deque()
+
+    def step_gmls() -> Iterable[Optional[str]]:
+        for key, step in steps:
+            submitted.append((key, step))
+            yield step.gml
+
+    for error in parallel_map(_check_rule_gml, step_gmls(), processes):
+        key, step = submitted.popleft()
+
+        if error is not None:
+            step.set_load_error(error)
+
+        yield key, step
+
+
+def load_mechanisms(mechanism_file: str = "mechanisms.json", sorted_by_entry: bool = False,
+                    reorder_buffer: int = 0, processes: int = 1, skip_invalid: bool = False,
+                    errors: Optional[List[RuleLoadError]] = None, verbosity: int = 0) -> Iterable[Mechanism]:
+    buffer_size = 1 if sorted_by_entry else reorder_buffer
 
     mechanisms: Dict[Tuple[int, int], List[Step]] = {}
+    completed: Set[Tuple[int, int]] = set()
+
+    check = skip_invalid or errors is not None
+
+    steps = _load_steps(mechanism_file, verbosity)
+    if check and processes > 1:
+        steps = _check_steps(steps, processes)
+
+    def make_mechanism(entry: int, number: int, mechanism_steps: List[Step]) -> Iterable[Mechanism]:
+        if check and processes <= 1:
+            for mechanism_step in mechanism_steps:
+                mechanism_step.load()
+
+        step_errors = [step.load_error for step in mechanism_steps if step.load_error is not None]
+
+        if errors is not None:
+            errors.extend(step_errors)
+
+        if not skip_invalid or len(step_errors) == 0:
+            yield Mechanism(entry, number, mechanism_steps)
+
+    for key, step in steps:
+        if key in completed:
+            raise ValueError(f"Steps of proposal {key[0]}_{key[1]} in '{mechanism_file}' are further apart than "
+                             f"the reorder buffer allows")
+
+        if buffer_size <= 0:
+            mechanisms.setdefault(key, []).append(step)
+            continue
+
+        mechanism_steps = mechanisms.pop(key, [])
+        mechanism_steps.append(step)
+        mechanisms[key] = mechanism_steps
+
+        while len(mechanisms) > buffer_size:
+            entry, number = next(iter(mechanisms))
+            completed.add((entry, number))
+
+            yield from make_mechanism(entry, number, mechanisms.pop((entry, number)))
+
+    for (entry, number), mechanism_steps in mechanisms.items():
+        yield from make_mechanism(entry, number, mechanism_steps)
+
 
-    for step_json in mechanisms_json:
-        step_json["gml"] = step_json["gml"].replace(">", ":")
+def parallel_map(function: Callable[[Any], Any], items: Iterable[Any], processes: int,
+                 initializer: Optional[Callable[..., None]] = None, initargs: Tuple = (), window: int = 0) ->\
+        Iterable[Any]:
+    if window <= 0:
+        window = 4 * processes
 
-        entry = step_json["entry"]
-        mechanism = step_json["proposal"]
-        step = Step.deserialise(step_json)
+    with ProcessPoolExecutor(max_workers=processes, initializer=initializer, initargs=initargs) as executor:
+        pending: Deque[Future] = deque()
 
-        if (entry, mechanism) not in mechanisms:
-            mechanisms[(entry, mechanism)] = []
+        for item in items:
+            pending.append(executor.submit(function, item))
 
-        mechanisms[(entry, mechanism)].append(step)
+            if len(pending) >= window:
+                yield pending.popleft().result()
 
-    for (entry, number), steps in mechanisms.items():
-        yield Mechanism(entry, number, steps)
+        while len(pending) > 0:
+            yield pending.popleft().result()
@@ -1,3 +1,4 @@
+from overlay_graphs.substrate_rule_bundle import write_substrate_rule_bundle
 from overlay_graphs.substrate_rules import substrate_rules_for_entries
 from overlay_graphs.mcsadb import MCSADB
 
@@ -7,6 +8,8 @@ def _compute_substrate_rules():
 
     substrate_rules_for_entries(db.entries)
 
+    write_substrate_rule_bundle(verbosity=1)
+
 
 if __name__ == "__main__":
     _compute_substrate_rules()
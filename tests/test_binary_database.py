@@ -0,0 +1,150 @@
+import json
+import pytest
+import random
+
+
+pytest.importorskip("mod")
+
+
+from overlay_graphs.binary_database import BinaryOverlayGraphDatabase, convert_json_database, is_binary_database,\
+    write_binary_database
+from overlay_graphs.mcsadb import MCSADB
+from overlay_graphs.overlay_graph import OverlayGraph
+from typing import Any, Dict, List, Tuple
+
+
+_labels = ["C", "N+", "O-", "H", "Amino(S, Ser, 195, Ser195)", "Žluť"]
+_edge_labels = ["-", "=", "?", ":", ">"]
+
+
+def _overlay_graph_json(generator: random.Random, digest: bool) -> Dict[str, Any]:
+    nodes = generator.sample(range(-5, 100), generator.randint(0, 8))
+    edges = {tuple(sorted(generator.sample(nodes, 2))) for _ in range(generator.randint(0, 12))} if len(nodes) > 1\
+        else set()
+
+    og_json = {
+        "nodes": [{"id": node, "label": generator.choice(_labels), "electrons_donated": generator.randint(0, 3),
+                   "electrons_received": generator.randint(0, 3)} for node in nodes],
+        "edges": [{"src": source, "tar": target, "label": generator.choice(_edge_labels),
+                   "electrons_donated": generator.randint(0, 2), "electrons_received": generator.randint(0, 2)}
+                  for source, target in (edge if generator.random() < 0.5 else edge[::-1] for edge in edges)]
+    }
+
+    if digest:
+        og_json["digest"] = "".join(generator.choice("0123456789abcdef") for _ in range(32))
+
+    return og_json
+
+
+def _entries(seed: int) -> List[Dict[str, Any]]:
+    generator = random.Random(seed)
+
+    entries = []
+    for entry in range(30):
+        mechanism_json = {"entry": entry, "proposal": generator.randint(1, 3), "steps": []}
+        if generator.random() < 0.8:
+            mechanism_json["ec"] = f"{generator.randint(1, 7)}.{generator.randint(1, 4)}.-.-"
+
+        entries.append({"mechanism": mechanism_json,
+                        "overlay_graphs": [_overlay_graph_json(generator, generator.random() < 0.5)
+                                           for _ in range(generator.randint(0, 4))]})
+
+    return entries
+
+
+def _normalised(og_json: Dict[str, Any]) -> Tuple[List[Tuple], List[Tuple]]:
+    return sorted((node["id"], node["label"], node["electrons_donated"], node["electrons_received"])
+                  for node in og_json["nodes"]),\
+        sorted((min(edge["src"], edge["tar"]), max(edge["src"], edge["tar"]), edge["label"],
+                edge["electrons_donated"], edge["electrons_received"]) for edge in og_json["edges"])
+
+
+def _overlay_graph_normalised(overlay_graph: OverlayGraph) -> Tuple[List[Tuple], List[Tuple]]:
+    host_graph = overlay_graph.host_graph
+
+    return sorted((node, label, overlay_graph.electrons_donated(node), overlay_graph.electrons_received(node))
+                  for node, label in host_graph.nodes(data="label")),\
+        sorted((min(source, target), max(source, target), label, overlay_graph.electrons_donated((source, target)),
+                overlay_graph.electrons_received((source, target)))
+               for source, target, label in host_graph.edges(data="label"))
+
+
+@pytest.fixture
+def databases(tmp_path) -> Tuple[List[Dict[str, Any]], str, str]:
+    entries = _entries(3)
+
+    json_path = str(tmp_path / "overlay_graphs.json")
+    with open(json_path, "w") as file:
+        json.dump(entries, file, ensure_ascii=False)
+
+    binary_path = str(tmp_path / "overlay_graphs.ogdb")
+    convert_json_database(json_path, binary_path)
+
+    return entries, json_path, binary_path
+
+
+def test_round_trip(databases):
+    entries, json_path, binary_path = databases
+
+    assert is_binary_database(binary_path) and not is_binary_database(json_path)
+
+    with BinaryOverlayGraphDatabase(binary_path) as database:
+        assert len(database) == len(entries)
+        assert database.graph_count == sum(len(entry["overlay_graphs"]) for entry in entries)
+
+        for index, entry in enumerate(entries):
+            mechanism_json = entry["mechanism"]
+
+            assert database.entry_key(index) == (mechanism_json["entry"], mechanism_json["proposal"])
+            assert database.entry_ec(index) == mechanism_json.get("ec")
+            assert database.mechanism_json(index) == mechanism_json
+
+            graphs = database.entry_graphs(index)
+            assert len(graphs) == len(entry["overlay_graphs"])
+
+            for graph, og_json in zip(graphs, entry["overlay_graphs"]):
+                compact = database.compact_overlay_graph(graph)
+
+                assert _normalised(compact.serialise()) == _normalised(og_json)
+                assert compact.digest == og_json.get("digest")
+                assert _overlay_graph_normalised(database.overlay_graph(graph)) == _normalised(og_json)
+
+
+def test_write_matches_conversion(databases, tmp_path):
+    entries, json_path, binary_path = databases
+
+    written_path = str(tmp_path / "written.ogdb")
+    write_binary_database(written_path, entries)
+
+    with open(written_path, "rb") as written, open(binary_path, "rb") as converted:
+        assert written.read() == converted.read()
+
+
+def test_mcsadb_reads_both_formats(databases):
+    entries, json_path, binary_path = databases
+
+    with MCSADB(json_path) as json_database, MCSADB(binary_path) as binary_database:
+        assert len(json_database) == len(binary_database) == len(entries)
+
+        for index, entry in enumerate(entries):
+            json_entry = json_database[index]
+            binary_entry = binary_database[index]
+
+            assert (json_entry.entry, json_entry.mechanism) == (binary_entry.entry, binary_entry.mechanism)
+            assert [_overlay_graph_normalised(overlay_graph) for overlay_graph in binary_entry.overlay_graphs] ==\
+                [_normalised(og_json) for og_json in entry["overlay_graphs"]]
+
+            for database in (json_database, binary_database):
+                raw_json = json.loads(database.raw_entry(index))
+
+                assert raw_json["mechanism"] == entry["mechanism"]
+                assert [_normalised(og_json) for og_json in raw_json["overlay_graphs"]] ==\
+                    [_normalised(og_json) for og_json in entry["overlay_graphs"]]
+
+
+def test_marking_out_of_range(tmp_path):
+    og_json = {"nodes": [{"id": 1, "label": "C", "electrons_donated": 200, "electrons_received": 0}], "edges": []}
+
+    with pytest.raises(ValueError, match="int8"):
+        write_binary_database(str(tmp_path / "invalid.ogdb"),
+                              [{"mechanism": {"entry": 1, "proposal": 1, "steps": []}, "overlay_graphs": [og_json]}])
@@ -0,0 +1,48 @@
+import pytest
+import re
+
+
+from overlay_graphs.label_parser import abstract_vertex_term_details, is_alias_term, is_amino_term, is_term,\
+    parse_vertex_term, remove_vertex_term
+
+
+_amino_pattern: re.Pattern = re.compile(r"^[\s]*Amino\([\s]*([a-zA-Z0-9+\-]+)[\s]*,[\s]*([a-zA-Z]+)[\s]*,"
+                                        r"[\s]*([0-9]+)[^)]+\)[\s]*$")
+_alias_pattern: re.Pattern = re.compile(r"^[\s]*Alias\([\s]*([a-zA-Z0-9+\-]+)[\s]*,[^)]+\)[\s]*$")
+
+_labels = ["C", "O-", "H+", "Amino(C, Cys, 145, Cys145)", " Amino( N ,His, 57 , *) ", "Amino(O-, Asp, 102, x)",
+           "Amino(C, Cys, *, *)", "Alias(O, Water)", "Alias(N+, *)", "Alias(O)", "Amino(C, 12, 3, x)", ""]
+
+
+@pytest.mark.parametrize("label", _labels)
+def test_predicates_match_the_patterns(label: str):
+    assert is_amino_term(label) == (_amino_pattern.match(label) is not None)
+    assert is_alias_term(label) == (_alias_pattern.match(label) is not None)
+    assert is_term(label) == (is_amino_term(label) or is_alias_term(label))
+
+
+@pytest.mark.parametrize("label", _labels)
+def test_rewrites_match_the_patterns(label: str):
+    assert remove_vertex_term(label) == _alias_pattern.sub(r"\1", _amino_pattern.sub(r"\1", label))
+
+    for preserve_chain_position, substitute in [(False, r"Amino(\1, \2, *, *)"), (True, r"Amino(\1, \2, \3, *)")]:
+        assert abstract_vertex_term_details(label, preserve_chain_position) ==\
+            _alias_pattern.sub(r"Alias(\1, *)", _amino_pattern.sub(substitute, label))
+
+
+def test_terms_are_parsed_once():
+    label = "Amino(S, Ser, 195, Ser195)"
+
+    term = parse_vertex_term(label)
+
+    assert term is parse_vertex_term(label)
+    assert (term.symbol, term.residue, term.chain_position) == ("S", "Ser", "195")
+    assert term.is_amino and not term.is_alias
+
+
+def test_alias_and_plain_labels():
+    term = parse_vertex_term("Alias(O-, Hydroxide)")
+
+    assert (term.symbol, term.residue, term.chain_position) == ("O-", None, None)
+    assert term.is_alias and not term.is_amino
+    assert parse_vertex_term("O-") is None
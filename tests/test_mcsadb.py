@@ -0,0 +1,104 @@
+import functools
+import pytest
+import random
+
+
+pytest.importorskip("mod")
+
+
+from overlay_graphs.mcsadb import ECIndex, MCSAIndexEntry
+from overlay_graphs.mechanism import ECNumber
+from typing import Dict, List, Tuple
+
+
+def _level_less(left: str, right: str) -> bool:
+    if left == "-":
+        return True
+
+    if right == "-":
+        return False
+
+    if left.isnumeric():
+        if not right.isnumeric():
+            return True
+        if int(left) != int(right):
+            return int(left) < int(right)
+
+    if right.isnumeric():
+        return False
+
+    return left < right
+
+
+def _less(left: ECNumber, right: ECNumber) -> bool:
+    for level in range(0, 4):
+        if left[level] != right[level]:
+            return _level_less(left[level], right[level])
+
+    return False
+
+
+_ec_ids = ["1.1.1.1", "1.1.1.2", "1.1.1.10", "1.1.1.n1", "1.1.1.-", "1.1.-.-", "1.-.-.-", "2.7.11.1", "2.7.1.1",
+           "3.4.21.4", "3.4.21.n2", "3.4.22.-", "3.4.-.-", "3.1.1.7", "3.1.1.07", "4.2.1.1", "7.1.2.2"]
+
+
+def test_ordering_matches_level_comparison():
+    ecs = [ECNumber(ec_id) for ec_id in _ec_ids]
+
+    for left in ecs:
+        for right in ecs:
+            assert (left < right) == _less(left, right)
+            assert (left > right) == _less(right, left)
+            assert (left <= right) == (_less(left, right) or left == right)
+
+
+def test_sorting_uses_sort_keys():
+    ecs = [ECNumber(ec_id) for ec_id in _ec_ids]
+
+    assert [str(ec) for ec in sorted(ecs, key=lambda ec: ec.sort_key)] ==\
+        [str(ec) for ec in sorted(ecs, key=functools.cmp_to_key(lambda left, right: -1 if _less(left, right) else
+                                                                  1 if _less(right, left) else 0))]
+
+
+def _index_entries(seed: int) -> List[MCSAIndexEntry]:
+    generator = random.Random(seed)
+
+    return [MCSAIndexEntry(position, 1, ECNumber(generator.choice(_ec_ids)) if generator.random() < 0.9 else None,
+                           generator.randint(0, 5), (position, position))
+            for position in range(200)]
+
+
+@pytest.mark.parametrize("query", [None, "1.-.-.-", "1.1.1.-", "3.4.-.-", "3.-.21.-", "-.-.-.1", "3.4.21.4",
+                                   "5.-.-.-", "-.-.-.-"])
+def test_positions_match_containment(query: str):
+    entries = _index_entries(7)
+    ec = ECNumber(query) if query is not None else None
+
+    matching = [position for position, entry in enumerate(entries)
+                if entry.ec is not None and (ec is None or entry.ec in ec)]
+
+    positions = list(ECIndex(entries).positions(ec))
+
+    assert sorted(positions) == matching
+    assert [entries[position].ec.sort_key for position in positions] ==\
+        sorted(entries[position].ec.sort_key for position in matching)
+
+    for ec_id in _ec_ids:
+        assert [position for position in positions if str(entries[position].ec) == ec_id] ==\
+            [position for position in matching if str(entries[position].ec) == ec_id]
+
+
+@pytest.mark.parametrize("level", [0, 1, 2, 3, 4])
+def test_counts_aggregate_entries(level: int):
+    entries = _index_entries(11)
+
+    counts: Dict[ECNumber, Tuple[int, int]] = {}
+    for entry in entries:
+        if entry.ec is None:
+            continue
+
+        ec = entry.ec.abstract(level)
+        entry_count, overlay_graph_count = counts.get(ec, (0, 0))
+        counts[ec] = (entry_count + 1, overlay_graph_count + entry.overlay_graph_count)
+
+    assert ECIndex(entries).counts(level) == counts
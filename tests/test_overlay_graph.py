@@ -0,0 +1,54 @@
+import networkx as nx
+import pytest
+import re
+
+
+pytest.importorskip("mod")
+
+
+from overlay_graphs.overlay_graph import CompactOverlayGraph, LabelPatternFormatter, OverlayGraph,\
+    label_pattern_formatter
+
+
+def _substitute(label_pattern: str, original_label: str, electrons_donated: int, electrons_received: int) -> str:
+    label = re.sub(r"L", original_label, label_pattern)
+    label = re.sub(r"-", str(electrons_donated), label)
+    label = re.sub(r"\+", str(electrons_received), label)
+    return re.sub(r"b", str(electrons_received - electrons_donated), label)
+
+
+_label_patterns = ["L", "L_+_-", "L_b", "-/+/b", "{L}", "L{+}", "Lb-+"]
+_original_labels = ["C", "O-", "N+", "Pb", "Amino(O-, Asp, 102, x)", "{x}", "-", ""]
+
+
+@pytest.mark.parametrize("label_pattern", _label_patterns)
+@pytest.mark.parametrize("original_label", _original_labels)
+def test_format_matches_substitution(label_pattern: str, original_label: str):
+    formatter = LabelPatternFormatter(label_pattern)
+
+    for electrons_donated, electrons_received in [(0, 0), (1, 0), (0, 2), (3, 1), (12, 7)]:
+        assert formatter.format(original_label, electrons_donated, electrons_received) ==\
+            _substitute(label_pattern, original_label, electrons_donated, electrons_received)
+
+
+def test_formatters_are_shared_per_pattern():
+    formatter = label_pattern_formatter("L_+_-")
+
+    assert formatter is label_pattern_formatter("L_+_-")
+    assert formatter.label_pattern == "L_+_-"
+    assert formatter is not label_pattern_formatter("L")
+
+
+def test_compact_marking_ignores_missing_elements():
+    host_graph = nx.Graph()
+    host_graph.add_node(1, label="C")
+    host_graph.add_node(2, label="O")
+    host_graph.add_edge(1, 2, label="-")
+
+    overlay_graph = OverlayGraph(host_graph, {2: (1, 0), 99: (0, 0), (1, 2): (0, 1), (2, 99): (2, 2)})
+    compact = CompactOverlayGraph.from_overlay_graph(overlay_graph)
+
+    assert [(compact.electrons_received(node), compact.electrons_donated(node)) for node in (1, 2, 99)] ==\
+        [(0, 0), (1, 0), (0, 0)]
+    assert (compact.electrons_received((1, 2)), compact.electrons_donated((1, 2))) == (0, 1)
+    assert set(compact.to_overlay_graph().action) == {2, (1, 2)}
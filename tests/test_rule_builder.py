@@ -0,0 +1,59 @@
+import pytest
+import random
+
+
+pytest.importorskip("mod")
+
+
+from overlay_graphs.rule_builder import EdgeTuple, RuleBuilder
+
+
+def _random_builder(seed: int) -> RuleBuilder:
+    generator = random.Random(seed)
+    builder = RuleBuilder(f"rule_{seed}")
+
+    for _ in range(generator.randint(1, 25)):
+        operation = generator.choice(["vertex", "edge"])
+        side = generator.choice(["left", "context", "right"])
+        label = generator.choice(["C", "O-", "N+", "-", "=", "Amino(C, Cys, 145, *)"])
+
+        if operation == "vertex":
+            getattr(builder, f"add_{side}_vertex")(generator.randint(-2, 8), label)
+        else:
+            source = generator.randint(-2, 8)
+            getattr(builder, f"add_{side}_edge")(source, source + generator.randint(1, 5), label)
+
+    return builder
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_from_gml_round_trip(seed: int):
+    builder = _random_builder(seed)
+
+    parsed = RuleBuilder.from_gml(builder.to_gml())
+
+    assert parsed.to_gml() == builder.to_gml()
+    assert parsed.vertices == builder.vertices
+    assert parsed.edges == builder.edges
+    assert parsed.max_vertex == builder.max_vertex
+
+
+def test_from_gml_sides():
+    gml = "\n".join(['rule [', '\truleID "example"', '\tleft [', '\t\tedge [ source 1 target 2 label "-" ]', '\t]',
+                     '\tcontext [', '\t\tnode [ id 1 label "C" ]', '\t\tnode [ id 2 label "O" ]', '\t]',
+                     '\tright [', '\t\tedge [ source 2 target 1 label "=" ]', '\t]', ']'])
+
+    builder = RuleBuilder.from_gml(gml)
+
+    assert builder.to_gml() == gml.replace("source 2 target 1", "source 1 target 2")
+    assert builder.vertices == {1, 2}
+    assert builder.edges == {EdgeTuple((1, 2))}
+    assert dict(builder.left_graph.nodes(data="label")) == {1: "C", 2: "O"}
+    assert list(builder.left_graph.edges(data="label")) == [(1, 2, "-")]
+    assert list(builder.combined_graph.edges(data="label")) == [(1, 2, "(-; =)")]
+
+
+def test_from_gml_rejects_unsupported_lines():
+    with pytest.raises(ValueError, match="Unsupported line"):
+        RuleBuilder.from_gml('rule [\n\truleID "x"\n\tleft [\n\t\tnode [ id 1 label "C" stereo "tetrahedral" ]\n'
+                             '\t]\n]')
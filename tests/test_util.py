@@ -0,0 +1,61 @@
+import io
+import json
+import pytest
+
+
+pytest.importorskip("mod")
+
+
+from overlay_graphs.util import iterate_json_array
+from typing import Any, List, Tuple
+
+
+def _elements(data: bytes, chunk_size: int) -> List[Tuple[int, int, Any]]:
+    return list(iterate_json_array(io.BytesIO(data), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_elements_and_byte_offsets(chunk_size: int):
+    values = [{"name": "Žluťoučký kůň", "values": [1, 2.5, -2500.125]}, "a", -2500, 1e-7, None, True, []]
+    data = json.dumps(values, ensure_ascii=False).encode("utf-8")
+
+    elements = _elements(data, chunk_size)
+
+    assert [value for start, end, value in elements] == values
+    assert all(json.loads(data[start:end]) == value for start, end, value in elements)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+def test_number_split_across_chunks(chunk_size: int):
+    data = b"[-2500.75e-2 , 12345678901234567890]"
+
+    assert [value for start, end, value in _elements(data, chunk_size)] == [-25.0075, 12345678901234567890]
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ]  ", b"\n[\n]\n"])
+def test_empty_array(data: bytes):
+    assert _elements(data, 1) == []
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"{}", "Expected a JSON array at byte 0"),
+    (b"[1 2]", "Expected ',' or ']' at byte 3"),
+    (b"[1,,2]", "Expected a JSON value at byte 3"),
+    (b"[1,]", "Expected a JSON value at byte 3"),
+    (b"[,1]", "Expected a JSON value at byte 1"),
+    (b"[1, 2", "Unexpected end of JSON array at byte 5"),
+    (b"[1, tru]", "Invalid JSON array element at byte 4"),
+])
+@pytest.mark.parametrize("chunk_size", [1, 1 << 20])
+def test_malformed_arrays(data: bytes, message: str, chunk_size: int):
+    with pytest.raises(ValueError, match=message.replace("[", r"\[")):
+        _elements(data, chunk_size)
+
+
+def test_malformed_element_fails_without_reading_the_rest():
+    file = io.BytesIO(b"[1, {\"a\": nope}, " + b"0, " * 100000 + b"0]")
+
+    with pytest.raises(ValueError, match="Invalid JSON array element"):
+        list(iterate_json_array(file, 64))
+
+    assert file.tell() < 1024